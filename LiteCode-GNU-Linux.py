@@ -4,21 +4,1241 @@
 # This program is free software: you can redistribute it and/or modify
 # it under the terms of the GNU Affero General Public License as published
 # by the Free Software Foundation, either version 3 of the License,
-# or (at your option) any later version.import tkinter as tk
+# or (at your option) any later version.
 
-from tkinter import ttk, filedialog, messagebox, simpledialog
+import tkinter as tk
+import tkinter.font as tkfont
+from tkinter import ttk, filedialog, messagebox
 import re
 import subprocess
 import os
 import sys
 import time
-from threading import Thread
-from collections import OrderedDict
+import mmap
+import tempfile
+import ctypes
+import select
+import struct
+import fnmatch
+import queue
+import sqlite3
+import hashlib
+import selectors
+import signal
+import codecs
+import shlex
+import shutil
+import errno
+import socket
+import resource
+from threading import Thread, Event, Condition, Lock
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict, deque
 import json
+import math
+import functools
+import itertools
+from bisect import bisect_left, bisect_right
 import http.server
 import socketserver
 import webbrowser
 
+TOKEN_TAGS = ("keyword", "number", "string", "comment", "builtin")
+HL_SYNC_LINES = 200
+HL_CHUNK_SPANS = 1500
+HL_VIEWPORT_MARGIN = 100
+LOAD_CHUNK_CHARS = 1 << 18
+PAGE_LINES = 2000
+FIND_BATCH = 2000
+OUTPUT_FRAME_MS = 33
+STALE_BUILD_SECONDS = 3600
+UNSEEN = object()
+NON_BMP = re.compile("[\U00010000-\U0010FFFF]")
+
+# (col, length) of text[start:end] in Tk units; Tcl 8.6 keeps a non-BMP character as a surrogate pair counted twice
+def tk_span(text, line_start, start, end, wide):
+    col, length = start - line_start, end - start
+    if wide:
+        col += len(NON_BMP.findall(text, line_start, start))
+        length += len(NON_BMP.findall(text, start, end))
+    return col, length
+
+# --- Document Model ---
+REVISIONS = itertools.count(1)
+
+class PieceTable:
+    MAX_PIECES = 4096
+    MAX_APPEND = 4096
+
+    def __init__(self, text=""):
+        self.reset(text)
+
+    def reset(self, text):
+        self.buffers, self.breaks = [text], [self.find_breaks(text)]
+        self.pieces = [(0, 0, len(text), len(self.breaks[0]))] if text else []
+        self.length, self.newlines = len(text), len(self.breaks[0])
+        self.revision = next(REVISIONS)
+
+    @staticmethod
+    def find_breaks(text, base=0):
+        return [base + m.start() for m in re.finditer("\n", text)]
+
+    def count_breaks(self, buf, start, end):
+        breaks = self.breaks[buf]
+        return bisect_left(breaks, end) - bisect_left(breaks, start)
+
+    def line_count(self):
+        return self.newlines + 1
+
+    def locate(self, offset):
+        pos = 0
+        for i, (buf, start, length, nl) in enumerate(self.pieces):
+            if offset < pos + length: return i, offset - pos
+            pos += length
+        return len(self.pieces), 0
+
+    def offset(self, line, col):
+        if line <= 1: return min(col, self.length)
+        pos, need = 0, line - 1
+        for buf, start, length, nl in self.pieces:
+            if nl >= need:
+                breaks = self.breaks[buf]
+                return pos + breaks[bisect_left(breaks, start) + need - 1] - start + 1 + col
+            need -= nl
+            pos += length
+        return self.length
+
+    def insert(self, offset, chars):
+        if not chars: return
+        self.revision = next(REVISIONS)
+        i, rel = self.locate(offset)
+        buf = len(self.buffers) - 1
+        prev = self.pieces[i - 1] if i and not rel else None
+        if prev and prev[0] == buf != 0 and prev[1] + prev[2] == len(self.buffers[buf]) < self.MAX_APPEND:
+            breaks = self.find_breaks(chars, len(self.buffers[buf]))
+            self.buffers[buf] += chars
+            self.breaks[buf].extend(breaks)
+            self.pieces[i - 1] = (buf, prev[1], prev[2] + len(chars), prev[3] + len(breaks))
+        else:
+            breaks = self.find_breaks(chars)
+            self.buffers.append(chars)
+            self.breaks.append(breaks)
+            piece = (buf + 1, 0, len(chars), len(breaks))
+            if not rel:
+                self.pieces.insert(i, piece)
+            else:
+                b, start, length, nl = self.pieces[i]
+                left = (b, start, rel, self.count_breaks(b, start, start + rel))
+                self.pieces[i:i + 1] = [left, piece, (b, start + rel, length - rel, nl - left[3])]
+        self.length += len(chars)
+        self.newlines += len(breaks)
+        if len(self.pieces) > self.MAX_PIECES: self.reset(self.text())
+
+    def delete(self, start, end):
+        end = min(end, self.length)
+        if end <= start: return
+        self.revision = next(REVISIONS)
+        i, rel = self.locate(start)
+        j, rel_end = self.locate(end)
+        stop = j + 1 if rel_end else j
+        keep = []
+        if rel:
+            b, s, length, nl = self.pieces[i]
+            keep.append((b, s, rel, self.count_breaks(b, s, s + rel)))
+        if rel_end:
+            b, s, length, nl = self.pieces[j]
+            keep.append((b, s + rel_end, length - rel_end, self.count_breaks(b, s + rel_end, s + length)))
+        self.newlines += sum(p[3] for p in keep) - sum(p[3] for p in self.pieces[i:stop])
+        self.pieces[i:stop] = keep
+        self.length -= end - start
+
+    def chunks(self, start=0, end=None):
+        end = self.length if end is None else end
+        pos = 0
+        for buf, s, length, nl in self.pieces:
+            if pos >= end: break
+            if pos + length > start:
+                yield self.buffers[buf][s + max(start - pos, 0):s + min(end - pos, length)]
+            pos += length
+
+    def text(self, start=0, end=None):
+        return "".join(self.chunks(start, end))
+
+    def lines(self, first, last):
+        end = self.offset(last + 1, 0) - 1 if last < self.line_count() else self.length
+        return self.text(self.offset(first, 0), end)
+
+    # shares the append-only buffers, so a snapshot costs one copy of the piece list
+    def snapshot(self):
+        snap = PieceTable.__new__(PieceTable)
+        snap.__dict__.update(self.__dict__)
+        snap.pieces = list(self.pieces)
+        return snap
+
+# read-only view of a file too large for the editor; lines are paged in on demand with pread rather than
+# mmap, so a file truncated while open (logrotate, > file.log) reads short instead of raising SIGBUS
+class MappedFile:
+    BLOCK = 1 << 16
+
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.fd = self.file.fileno()
+        self.size = os.fstat(self.fd).st_size
+        self.marks, self.offsets, self.lines = [1], [0], 1
+
+    # records the start of the last line in every block, so a seek scans at most one block
+    def build_index(self, cancel, progress):
+        lines = 1
+        try:
+            for start in range(0, self.size, self.BLOCK):
+                if cancel.is_set(): return False
+                block = os.pread(self.fd, self.BLOCK, start)
+                if not block: break
+                count = block.count(b"\n")
+                if count:
+                    lines += count
+                    self.marks.append(lines)
+                    self.offsets.append(start + block.rfind(b"\n") + 1)
+                if start // self.BLOCK % 64 == 0: progress(start / self.size)
+        except OSError:
+            return False
+        self.lines = lines
+        return True
+
+    def seek(self, line):
+        i = bisect_right(self.marks, line) - 1
+        pos, skip = self.offsets[i], line - self.marks[i]
+        while skip:
+            block = os.pread(self.fd, self.BLOCK, pos)
+            if not block: break
+            at = -1
+            while skip:
+                at = block.find(b"\n", at + 1)
+                if at < 0: break
+                skip -= 1
+            pos += len(block) if skip else at + 1
+        return pos
+
+    def read_lines(self, first, last):
+        start = self.seek(first)
+        end = self.seek(last + 1) - 1 if last < self.lines else self.size
+        return os.pread(self.fd, max(0, end - start), start).decode("utf-8", "replace").replace("\r\n", "\n")
+
+    def close(self):
+        self.file.close()
+
+# --- Performance Instrumentation ---
+class Histogram:
+    BUCKETS = 100
+
+    def __init__(self):
+        self.counts = [0] * self.BUCKETS
+        self.count, self.total, self.max = 0, 0.0, 0.0
+
+    # bucket i holds samples below 2 ** (i / 4) microseconds
+    def record(self, seconds):
+        us = seconds * 1e6
+        self.counts[min(self.BUCKETS - 1, int(math.log2(us) * 4) + 1) if us >= 1 else 0] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, p):
+        seen, target = 0, p / 100 * self.count
+        for i, n in enumerate(self.counts):
+            seen += n
+            if n and seen >= target: return min(2 ** (i / 4) / 1000, self.max * 1000)
+        return 0.0
+
+    def summary(self):
+        return {"count": self.count, "mean_ms": self.total * 1000 / max(self.count, 1), "p50_ms": self.percentile(50),
+                "p95_ms": self.percentile(95), "p99_ms": self.percentile(99), "max_ms": self.max * 1000}
+
+class PerfMonitor:
+    def __init__(self):
+        self.export_path = os.environ.get("LITECODE_PERF_EXPORT")
+        self.enabled = bool(os.environ.get("LITECODE_PERF") or self.export_path)
+        self.histograms = {}
+        self.lock = Lock()  # saves and folder listings record from their worker threads
+
+    def record(self, name, seconds):
+        with self.lock:
+            hist = self.histograms.get(name)
+            if hist is None: hist = self.histograms[name] = Histogram()
+            hist.record(seconds)
+
+    def timed(self, name):
+        def wrap(func):
+            @functools.wraps(func)
+            def timed_func(*args, **kwargs):
+                if not self.enabled: return func(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.record(name, time.perf_counter() - start)
+            return timed_func
+        return wrap
+
+    def summary(self):
+        return {name: hist.summary() for name, hist in sorted(self.histograms.items())}
+
+    def export(self, path):
+        with open(path, "w") as f:
+            json.dump({"time": time.time(), "metrics": self.summary()}, f, indent=2)
+
+PERF = PerfMonitor()
+
+# --- Scheduler ---
+class Scheduler:
+    def __init__(self, root):
+        self.root = root
+        self.pending = {}
+        self.timer = self.due = None
+
+    def schedule(self, name, func, delay=0, priority=0):
+        self.pending[name] = (priority, time.monotonic() + delay / 1000, func)
+        self.rearm()
+
+    def cancel(self, name):
+        if self.pending.pop(name, None): self.rearm()
+
+    def rearm(self):
+        due = min((t for _, t, _ in self.pending.values()), default=None)
+        if due == self.due: return
+        if self.timer: self.root.after_cancel(self.timer)
+        self.timer, self.due = None, due
+        if due is not None:
+            self.timer = self.root.after(max(0, int((due - time.monotonic()) * 1000)), self.run)
+
+    # a task may cancel or reschedule another due in the same tick, so each is re-checked before it runs
+    def run(self):
+        self.timer = self.due = None
+        now = time.monotonic()
+        for _, name in sorted((p, n) for n, (p, t, _) in self.pending.items() if t <= now + 0.001):
+            if name not in self.pending or self.pending[name][1] > now + 0.001: continue
+            try:
+                self.pending.pop(name)[2]()
+            except Exception:
+                self.root.report_callback_exception(*sys.exc_info())
+        self.rearm()
+
+# --- Save Service ---
+class SaveService:
+    POLL_MS = 50
+
+    def __init__(self, root):
+        self.root = root
+        self.pending, self.active, self.stamps = {}, set(), {}
+        self.results = queue.SimpleQueue()
+        self.cond = Condition()
+        self.timer = None
+
+    # one writer per path; requests queued while it writes collapse into the newest snapshot, and every
+    # collapsed request's callback gets that write's result. writers never call into Tk: completions are
+    # queued and run by poll() on the Tk thread
+    def save(self, path, doc, done):
+        if not self.timer: self.timer = self.root.after(self.POLL_MS, self.poll)
+        with self.cond:
+            callbacks = self.pending[path][1] if path in self.pending else []
+            self.pending[path] = (doc, callbacks + [done])
+            if path in self.active: return
+            self.active.add(path)
+        Thread(target=self.run, args=(path,), daemon=True).start()
+
+    def run(self, path):
+        while True:
+            with self.cond:
+                if path not in self.pending:
+                    self.active.discard(path)
+                    self.cond.notify_all()
+                    return
+                doc, callbacks = self.pending.pop(path)
+            try:
+                self.write(path, doc)
+                error = None
+            except OSError as e:
+                error = e
+            self.results.put((callbacks, error))
+
+    def poll(self):
+        self.timer = None
+        self.flush()
+        if self.active or not self.results.empty(): self.timer = self.root.after(self.POLL_MS, self.poll)
+
+    def flush(self):
+        while True:
+            try:
+                callbacks, error = self.results.get_nowait()
+            except queue.Empty:
+                return
+            for done in callbacks:
+                try:
+                    done(error)
+                except Exception:
+                    self.root.report_callback_exception(*sys.exc_info())
+
+    # what this process last read or wrote, so the file watcher can tell our own writes apart
+    def stamp(self, path):
+        st = os.stat(path)
+        self.stamps[path] = (st.st_mtime_ns, st.st_size)
+
+    # Tk thread only; completions of the writes waited for have run by the time it returns
+    def wait(self, path=None, timeout=10):
+        with self.cond:
+            done = self.cond.wait_for(lambda: not self.active if path is None else path not in self.active, timeout)
+        self.flush()
+        return done
+
+    # a symlink is written through: the temp file replaces its target, so the link itself survives
+    @PERF.timed("save_file")
+    def write(self, path, doc):
+        target = os.path.realpath(path)
+        folder = os.path.dirname(target)
+        fd, tmp = tempfile.mkstemp(prefix=f".{os.path.basename(target)}.", suffix=".tmp", dir=folder)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.writelines(doc.chunks())
+                f.flush()
+                os.fsync(f.fileno())
+            os.chmod(tmp, os.stat(target).st_mode & 0o7777 if os.path.exists(target) else 0o644)
+            os.replace(tmp, target)
+            self.stamp(path)
+        except BaseException:
+            if os.path.exists(tmp): os.unlink(tmp)
+            raise
+        dir_fd = os.open(folder, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+# --- File Watcher ---
+def ignored(name, patterns):
+    return any(fnmatch.fnmatch(name, p) for p in patterns)
+
+class FileWatcher:
+    def __init__(self, path, callback, ignore=()):
+        self.path, self.callback, self.ignore = path, callback, ignore
+        self.stopped = Event()
+
+    @staticmethod
+    def create(path, callback, ignore=()):
+        try:
+            return InotifyWatcher(path, callback, ignore)
+        except (OSError, AttributeError):
+            return PollingWatcher(path, callback, ignore)
+
+    def start(self):
+        Thread(target=self.run, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+
+# events are ("created", path), ("deleted", path), ("modified", path), ("moved", old, new), ("rescan", root)
+# or ("polling", root, reason) when inotify cannot cover the tree and the watcher falls back to polling,
+# or ("unwatched", dir, reason) for a directory left out because it could not be watched
+class InotifyWatcher(FileWatcher):
+    IN_CLOSE_WRITE, IN_MOVED_FROM, IN_MOVED_TO, IN_CREATE, IN_DELETE = 0x8, 0x40, 0x80, 0x100, 0x200
+    IN_Q_OVERFLOW, IN_IGNORED, IN_ISDIR = 0x4000, 0x8000, 0x40000000
+    MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+    def __init__(self, path, callback, ignore=()):
+        super().__init__(path, callback, ignore)
+        self.libc = ctypes.CDLL(None, use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0: raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.dirs = {}
+
+    # only running out of watches (ENOSPC) raises; other failures skip that directory and are returned as events
+    def add_tree(self, path):
+        skipped = []
+        for root, dirs, _ in os.walk(path):
+            dirs[:] = [d for d in dirs if not ignored(d, self.ignore)]
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(root), self.MASK)
+            if wd < 0:
+                err = ctypes.get_errno()
+                if err == errno.ENOSPC: raise OSError(err, "inotify watch limit reached")
+                if err != errno.ENOENT: skipped.append(("unwatched", root, os.strerror(err)))
+                continue
+            self.dirs[wd] = root
+        return skipped
+
+    def remove_tree(self, path):
+        for wd, root in list(self.dirs.items()):
+            if root == path or root.startswith(path + os.sep):
+                self.libc.inotify_rm_watch(self.fd, wd)
+                del self.dirs[wd]
+
+    def run(self):
+        try:
+            skipped = self.add_tree(self.path)
+        except OSError as e:
+            os.close(self.fd)
+            self.callback([("polling", self.path, e.strerror or str(e))])
+            return PollingWatcher(self.path, self.callback, self.ignore).run_with(self.stopped)
+        if skipped: self.callback(skipped)
+        while not self.stopped.is_set():
+            if not select.select([self.fd], [], [], 0.5)[0]: continue
+            time.sleep(0.05)  # let a burst settle into one batch
+            events = self.read_events()
+            if events: self.callback(events)
+        os.close(self.fd)
+
+    def read_events(self):
+        events, moves = [], {}
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                break
+            pos = 0
+            while pos < len(data):
+                wd, mask, cookie, length = struct.unpack_from("iIII", data, pos)
+                name = os.fsdecode(data[pos + 16:pos + 16 + length].rstrip(b"\0"))
+                pos += 16 + length
+                if mask & self.IN_Q_OVERFLOW:
+                    events.append(("rescan", self.path))
+                    continue
+                if mask & self.IN_IGNORED:
+                    self.dirs.pop(wd, None)
+                    continue
+                if wd not in self.dirs or not name or ignored(name, self.ignore): continue
+                path, is_dir = os.path.join(self.dirs[wd], name), bool(mask & self.IN_ISDIR)
+                if mask & self.IN_CREATE:
+                    events.append(("created", path))
+                elif mask & self.IN_DELETE:
+                    events.append(("deleted", path))
+                elif mask & self.IN_CLOSE_WRITE:
+                    events.append(("modified", path))
+                elif mask & self.IN_MOVED_FROM:
+                    moves[cookie] = (len(events), is_dir)
+                    events.append(("deleted", path))
+                elif mask & self.IN_MOVED_TO and cookie in moves:
+                    i, _ = moves.pop(cookie)
+                    old = events[i][1]
+                    events[i] = ("moved", old, path)
+                    if is_dir:
+                        for d, root in self.dirs.items():
+                            if root == old or root.startswith(old + os.sep): self.dirs[d] = path + root[len(old):]
+                    continue
+                elif mask & self.IN_MOVED_TO:
+                    events.append(("created", path))
+                if is_dir and mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                    try:
+                        events.extend(self.add_tree(path))
+                    except OSError:
+                        events.append(("rescan", self.path))
+        for i, is_dir in moves.values():
+            if is_dir: self.remove_tree(events[i][1])
+        return events
+
+# each full scan is followed by a pause of at least BUDGET times its own duration, so a huge tree polls rarely
+class PollingWatcher(FileWatcher):
+    INTERVAL = 2.0
+    BUDGET = 20
+
+    def scan(self):
+        stamps = {}
+        for root, dirs, files in os.walk(self.path):
+            dirs[:] = [d for d in dirs if not ignored(d, self.ignore)]
+            for name in dirs + [f for f in files if not ignored(f, self.ignore)]:
+                try:
+                    st = os.stat(os.path.join(root, name))
+                except OSError:
+                    continue
+                stamps[os.path.join(root, name)] = (st.st_mtime_ns, st.st_size)
+        return stamps
+
+    def run(self):
+        self.run_with(self.stopped)
+
+    def run_with(self, stopped):
+        start = time.monotonic()
+        stamps = self.scan()
+        while not stopped.wait(max(self.INTERVAL, (time.monotonic() - start) * self.BUDGET)):
+            start = time.monotonic()
+            fresh = self.scan()
+            events = [("deleted", p) for p in stamps if p not in fresh]
+            events += [("modified" if p in stamps else "created", p) for p, st in fresh.items() if stamps.get(p) != st]
+            stamps = fresh
+            if events: self.callback(events)
+
+# --- Search ---
+class FileSearch:
+    SNIFF = 8192
+    MMAP_BYTES = 1 << 20
+
+    # raises re.error for a bad regex; globs without a slash match the file name, others the relative path
+    def __init__(self, root, term, ignore=(), limit=2000, workers=8, index=None, regex=False, case=True, word=False,
+                 include=(), exclude=()):
+        self.root, self.ignore, self.limit, self.workers = root, ignore, limit, workers
+        self.include, self.exclude = include, exclude
+        self.term = term.encode("utf-8")
+        pattern = term if regex else re.escape(term)
+        if word: pattern = rf"\b(?:{pattern})\b"
+        self.pattern = re.compile(pattern.encode("utf-8"), re.MULTILINE if case else re.MULTILINE | re.IGNORECASE)
+        self.index = None if regex else index
+        self.results = queue.SimpleQueue()
+        self.cancelled, self.finished = Event(), Event()
+        self.lock = Lock()
+        self.count = self.files = 0
+        self.truncated = False
+
+    def start(self):
+        Thread(target=self.run, daemon=True).start()
+        return self
+
+    def cancel(self):
+        self.cancelled.set()
+
+    # files the index has seen unchanged and ruled out are never opened
+    def run(self):
+        narrowed = self.index.query(self.term) if self.index else None
+        with ThreadPoolExecutor(self.workers) as pool:
+            for entry in self.walk():
+                if self.cancelled.is_set(): break
+                if (self.include or self.exclude) and not self.wanted(entry.path): continue
+                if narrowed and entry.path not in narrowed[1]:
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    if narrowed[0].get(entry.path) == (st.st_mtime_ns, st.st_size): continue
+                pool.submit(self.scan, entry.path)
+        self.finished.set()
+
+    def wanted(self, path):
+        name, rel = os.path.basename(path), os.path.relpath(path, self.root)
+        match = lambda glob: fnmatch.fnmatch(rel if "/" in glob else name, glob)
+        return (not self.include or any(map(match, self.include))) and not any(map(match, self.exclude))
+
+    def walk(self):
+        stack = [self.root]
+        while stack and not self.cancelled.is_set():
+            try:
+                with os.scandir(stack.pop()) as it:
+                    for entry in it:
+                        if ignored(entry.name, self.ignore): continue
+                        if entry.is_dir(follow_symlinks=False): stack.append(entry.path)
+                        elif entry.is_file(): yield entry
+            except OSError:
+                continue
+
+    def scan(self, path):
+        if self.cancelled.is_set(): return
+        try:
+            with open(path, "rb") as f:
+                head = f.read(self.SNIFF)
+                if b"\0" in head: return
+                if len(head) < self.SNIFF or os.fstat(f.fileno()).st_size < self.MMAP_BYTES:
+                    hits = list(self.matches(head + f.read()))
+                else:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                        hits = list(self.matches(data))
+        except (OSError, ValueError):
+            return
+        with self.lock:
+            self.files += 1
+            hits = hits[:self.limit - self.count]
+            self.count += len(hits)
+            if self.count >= self.limit:
+                self.truncated = True
+                self.cancelled.set()
+        for line, text in hits:
+            self.results.put((path, line, text))
+
+    # one hit per line; line numbers are counted only up to each hit. data may be bytes or an mmap
+    # empty matches are skipped, as in the find bar, so patterns like ^$ or x* cannot stall on one position
+    def matches(self, data):
+        line, last, pos, size = 1, 0, 0, len(data)
+        while pos <= size and not self.cancelled.is_set():
+            m = self.pattern.search(data, pos)
+            if not m: return
+            if m.start() == m.end():
+                pos = m.end() + 1
+                continue
+            line += data[last:m.start()].count(b"\n")
+            start = last = data.rfind(b"\n", 0, m.start()) + 1
+            end = data.find(b"\n", m.start())
+            if end < 0: end = size
+            yield line, data[start:end].decode("utf-8", "replace").strip()
+            if end >= size: return
+            pos = end + 1
+
+    def drain(self):
+        rows = []
+        while True:
+            try:
+                rows.append(self.results.get_nowait())
+            except queue.Empty:
+                return rows
+
+def user_cache_dir(*parts):
+    path = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "litecode", *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+class TrigramIndex:
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS files (id INTEGER PRIMARY KEY, path TEXT UNIQUE, mtime INTEGER, size INTEGER);
+        CREATE TABLE IF NOT EXISTS postings (trigram INTEGER, file INTEGER, PRIMARY KEY (trigram, file)) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS postings_file ON postings (file);
+    """
+
+    def __init__(self, root, ignore=(), max_bytes=4 << 20):
+        self.root, self.ignore, self.max_bytes = root, ignore, max_bytes
+        self.path = os.path.join(user_cache_dir(), hashlib.sha1(os.fsencode(root)).hexdigest()[:16] + ".db")
+        self.writer = ThreadPoolExecutor(1)
+        self.closed = Event()
+        self.db = None
+
+    def start(self):
+        self.writer.submit(self.refresh)
+        return self
+
+    def close(self):
+        self.closed.set()
+        self.writer.shutdown(wait=False)
+
+    # all writes happen on the single writer thread; queries read through their own connection
+    def connect(self):
+        db = sqlite3.connect(self.path, timeout=30)
+        db.execute("PRAGMA journal_mode=WAL")
+        return db
+
+    def refresh(self):
+        db = self.db = self.connect()
+        db.executescript(self.SCHEMA)
+        known = {path: (mtime, size) for path, mtime, size in db.execute("SELECT path, mtime, size FROM files")}
+        stack, pending = [self.root], 0
+        while stack and not self.closed.is_set():
+            try:
+                entries = list(os.scandir(stack.pop()))
+            except OSError:
+                continue
+            for entry in entries:
+                if ignored(entry.name, self.ignore): continue
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file():
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    if known.pop(entry.path, None) != (st.st_mtime_ns, st.st_size):
+                        self.index_file(entry.path)
+                        pending += 1
+                        if pending % 200 == 0: db.commit()
+        if not self.closed.is_set():
+            for path in known: self.forget(path)
+        db.commit()
+
+    def update(self, paths):
+        self.writer.submit(self.apply_updates, paths)
+
+    # a directory event (its mtime moves on every atomic save inside it) only re-reads files whose stamp changed
+    def apply_updates(self, paths):
+        if self.db is None: return
+        for path in paths:
+            if os.path.isdir(path):
+                for root, dirs, files in os.walk(path):
+                    dirs[:] = [d for d in dirs if not ignored(d, self.ignore)]
+                    for name in files:
+                        if not ignored(name, self.ignore) and self.stale(os.path.join(root, name)):
+                            self.index_file(os.path.join(root, name))
+            elif os.path.isfile(path):
+                if not ignored(os.path.basename(path), self.ignore) and self.stale(path): self.index_file(path)
+            else:
+                self.forget(path)
+                prefix = path + os.sep
+                ids = list(self.db.execute("SELECT id FROM files WHERE substr(path, 1, ?) = ?", (len(prefix), prefix)))
+                self.db.executemany("DELETE FROM postings WHERE file = ?", ids)
+                self.db.executemany("DELETE FROM files WHERE id = ?", ids)
+        self.db.commit()
+
+    def stale(self, path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return True
+        return self.db.execute("SELECT mtime, size FROM files WHERE path = ?", (path,)).fetchone() != (st.st_mtime_ns, st.st_size)
+
+    def forget(self, path):
+        row = self.db.execute("SELECT id FROM files WHERE path = ?", (path,)).fetchone()
+        if row:
+            self.db.execute("DELETE FROM postings WHERE file = ?", row)
+            self.db.execute("DELETE FROM files WHERE id = ?", row)
+
+    # trigrams are taken from the lowercased bytes, so one index serves case-sensitive and -insensitive queries
+    def index_file(self, path):
+        self.forget(path)
+        try:
+            st = os.stat(path)
+            if st.st_size > self.max_bytes: return
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return
+        data = b"" if b"\0" in data[:FileSearch.SNIFF] else data.lower()
+        grams = {data[i:i + 3] for i in range(len(data) - 2)}
+        file = self.db.execute("INSERT INTO files (path, mtime, size) VALUES (?, ?, ?)",
+                               (path, st.st_mtime_ns, st.st_size)).lastrowid
+        self.db.executemany("INSERT INTO postings VALUES (?, ?)", ((int.from_bytes(g, "big"), file) for g in grams))
+
+    # returns ({path: (mtime, size)}, paths containing every trigram of the term), or None if the term is too short
+    def query(self, term):
+        term = term.lower()
+        grams = list({int.from_bytes(term[i:i + 3], "big") for i in range(len(term) - 2)})
+        if not grams or not os.path.exists(self.path): return None
+        db = self.connect()
+        try:
+            stamps = {path: (mtime, size) for path, mtime, size in db.execute("SELECT path, mtime, size FROM files")}
+            marks = ",".join("?" * len(grams))
+            matches = {path for path, in db.execute(
+                f"SELECT path FROM files WHERE id IN (SELECT file FROM postings WHERE trigram IN ({marks}) "
+                f"GROUP BY file HAVING COUNT(*) = {len(grams)})", grams)}
+        except sqlite3.Error:
+            return None
+        finally:
+            db.close()
+        return stamps, matches
+
+# --- Execution ---
+# limits are (resource.RLIMIT_*, value) pairs applied in the child before exec, never past the existing hard limit
+def apply_limits(limits):
+    for res, value in limits:
+        hard = resource.getrlimit(res)[1]
+        # a CPU hard limit one second past the soft one lets SIGXCPU arrive before SIGKILL
+        limit = value + 1 if res == resource.RLIMIT_CPU else value
+        if hard != resource.RLIM_INFINITY: value, limit = min(value, hard), min(limit, hard)
+        resource.setrlimit(res, (value, limit))
+
+# "{name}" placeholders are substituted inside arguments; a placeholder bound to a list splices in as separate arguments
+def expand_command(template, values, quote=str):
+    args = []
+    for arg in template:
+        if isinstance(values.get(arg), list):
+            args += values[arg]
+            continue
+        for key, value in values.items():
+            if not isinstance(value, list): arg = arg.replace(key, quote(value))
+        args.append(arg)
+    return args
+
+class BuildCache:
+    def __init__(self, root, prefs):
+        self.root, self.prefs = root, prefs  # build_cache_bytes is read on every eviction
+        self.temps = itertools.count()
+
+    # source, local "..." includes, the expanded build command and the compiler binary all feed the key
+    def key(self, source, build):
+        digest = hashlib.sha256("\0".join(build).encode())
+        with open(source, "rb") as f:
+            data = f.read()
+        digest.update(data)
+        for name in re.findall(rb'#include\s*"([^"]+)"', data):
+            try:
+                with open(os.path.join(os.path.dirname(source), os.fsdecode(name)), "rb") as f:
+                    digest.update(f.read())
+            except OSError:
+                pass
+        compiler = shutil.which(build[0])
+        if compiler:
+            st = os.stat(compiler)
+            digest.update(f"{compiler}:{st.st_mtime_ns}:{st.st_size}".encode())
+        return digest.hexdigest()[:32]
+
+    def artifact(self, key):
+        return os.path.join(self.root, key)
+
+    def lookup(self, key):
+        path = self.artifact(key)
+        if not os.path.exists(path): return None
+        os.utime(path)
+        return path
+
+    def temp_path(self, key):
+        return f"{self.artifact(key)}.{os.getpid()}.{next(self.temps)}.tmp"
+
+    # runs on the runner thread once the build step succeeded; the artifact just stored is never evicted
+    def store(self, temp, key):
+        if os.path.lexists(temp):
+            try:
+                os.replace(temp, self.artifact(key))
+            except OSError:
+                self.remove(temp)
+        self.evict(keep=self.artifact(key))
+
+    @staticmethod
+    def remove(path):
+        if os.path.isdir(path): shutil.rmtree(path, ignore_errors=True)
+        elif os.path.exists(path): os.unlink(path)
+
+    @staticmethod
+    def size(path):
+        if not os.path.isdir(path): return os.path.getsize(path)
+        return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+
+    # .tmp entries are in-flight builds; one left behind by a crashed session is dropped once it goes stale
+    def evict(self, keep=None):
+        entries, stale = [], time.time() - STALE_BUILD_SECONDS
+        for entry in os.scandir(self.root):
+            try:
+                if entry.name.endswith(".tmp"):
+                    if entry.stat().st_mtime < stale: self.remove(entry.path)
+                    continue
+                entries.append((entry.stat().st_mtime, self.size(entry.path), entry.path))
+            except OSError:
+                continue
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.prefs["build_cache_bytes"]: break
+            if path == keep: continue
+            self.remove(path)
+            total -= size
+
+class ProcessRunner:
+    # steps are argv lists run in order, or callables run on the runner thread (one that returns a process is
+    # pumped like a launched command); a failing step ends the run, and cleanup runs however the run ended
+    def __init__(self, steps, cwd=None, timeout=None, limits=(), cleanup=None):
+        self.steps, self.cwd, self.timeout, self.limits, self.cleanup = steps, cwd, timeout, limits, cleanup
+        self.id, self.name, self.started = None, "", False
+        self.output = deque()  # (stream, text) chunks; appended by the reader thread, drained by Tk
+        self.finished = Event()
+        self.proc = self.returncode = None
+        self.stopped = self.timed_out = False
+        self.elapsed = 0.0
+
+    def start(self):
+        self.started = True
+        Thread(target=self.run, daemon=True).start()
+        return self
+
+    @property
+    def pid(self):
+        return self.proc.pid if self.proc else None
+
+    @property
+    def state(self):
+        if self.finished.is_set():
+            if self.timed_out: return "timed out"
+            if self.stopped: return "stopped"
+            if self.returncode is None: return "failed to start"
+            if self.returncode < 0: return f"killed ({signal.strsignal(-self.returncode) or -self.returncode})"
+            return f"exit code {self.returncode}"
+        return "running" if self.started else "queued"
+
+    def run(self):
+        start = time.monotonic()
+        deadline = start + self.timeout if self.timeout else None
+        try:
+            for step in self.steps:
+                if self.stopped or self.timed_out: break
+                try:
+                    self.proc = step() if callable(step) else self.popen(step, self.cwd, self.limits)
+                    if self.proc is None: continue
+                except (OSError, subprocess.SubprocessError) as e:
+                    self.output.append(("stderr", f"{e}\n"))
+                    self.returncode = None
+                    break
+                if self.stopped: self.kill()  # stop() arrived before the process existed
+                self.returncode = self.pump(deadline)
+                if self.returncode != 0: break
+        finally:
+            try:
+                if self.cleanup: self.cleanup()
+            finally:
+                self.elapsed = time.monotonic() - start
+                self.finished.set()
+
+    @staticmethod
+    def popen(argv, cwd, limits=()):
+        return subprocess.Popen(argv, cwd=cwd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                start_new_session=True, preexec_fn=(lambda: apply_limits(limits)) if limits else None)
+
+    # both pipes are non-blocking and multiplexed on one selector, so neither can stall the other;
+    # the deadline still applies once both are closed, to a child that shut its stdio and kept running
+    def pump(self, deadline):
+        sel = selectors.DefaultSelector()
+        for stream, name in ((self.proc.stdout, "stdout"), (self.proc.stderr, "stderr")):
+            os.set_blocking(stream.fileno(), False)
+            sel.register(stream, selectors.EVENT_READ, (name, codecs.getincrementaldecoder("utf-8")("replace")))
+        while sel.get_map():
+            for key, _ in sel.select(0.5):
+                name, decoder = key.data
+                try:
+                    data = os.read(key.fd, 65536)
+                except BlockingIOError:
+                    continue
+                if not data: sel.unregister(key.fileobj)
+                text = decoder.decode(data, final=not data)
+                if text: self.output.append((name, text))
+            if deadline and not self.timed_out and time.monotonic() > deadline:
+                self.timed_out = True
+                self.kill()
+        sel.close()
+        if deadline and not self.timed_out:
+            try:
+                return self.proc.wait(max(0.0, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                self.timed_out = True
+                self.kill()
+        return self.proc.wait()
+
+    def stop(self):
+        self.stopped = True
+        if not self.started: self.finished.set()
+        self.kill()
+
+    # SIGTERM to the whole process group, SIGKILL if it is still around two seconds later
+    def kill(self):
+        if self.proc is None or self.proc.poll() is not None: return
+        self.signal_group(signal.SIGTERM)
+        def escalate():
+            try:
+                self.proc.wait(2)
+            except subprocess.TimeoutExpired:
+                self.signal_group(signal.SIGKILL)
+        Thread(target=escalate, daemon=True).start()
+
+    # a run forked by a warm worker may not have called setsid yet, so its group can still be missing
+    def signal_group(self, sig):
+        if self.proc is None: return
+        try:
+            os.killpg(self.proc.pid, sig)
+        except ProcessLookupError:
+            try:
+                os.kill(self.proc.pid, sig)
+            except ProcessLookupError:
+                pass
+
+# Runs inside each warm worker: imports the preload list once, then forks a fresh child per request
+WARM_WORKER = r'''
+import os, sys, json, socket, struct, runpy, importlib, traceback, resource
+sock = socket.socket(fileno=int(sys.argv[1]))
+for name in sys.argv[2:]:
+    try:
+        importlib.import_module(name)
+    except Exception:
+        pass
+while True:
+    try:
+        msg, fds, _, _ = socket.recv_fds(sock, 65536, 2)
+    except OSError:
+        break
+    if not msg: break
+    request = json.loads(msg)
+    sys.stdout.flush(); sys.stderr.flush()
+    pid = os.fork()
+    if pid == 0:
+        sock.close()
+        os.setsid()
+        os.dup2(os.open(os.devnull, os.O_RDONLY), 0)
+        os.dup2(fds[0], 1); os.dup2(fds[1], 2)
+        for fd in fds: os.close(fd)
+        sys.stdout, sys.stderr = os.fdopen(1, "w"), os.fdopen(2, "w", buffering=1)
+        for res, value in request["limits"]:
+            hard = resource.getrlimit(res)[1]
+            limit = value + 1 if res == resource.RLIMIT_CPU else value
+            if hard != resource.RLIM_INFINITY: value, limit = min(value, hard), min(limit, hard)
+            resource.setrlimit(res, (value, limit))
+        if request["cwd"]: os.chdir(request["cwd"])
+        sys.argv = [request["path"]]
+        sys.path[0] = os.path.dirname(os.path.abspath(request["path"]))
+        code = 0
+        try:
+            runpy.run_path(request["path"], run_name="__main__")
+        except SystemExit as e:
+            if e.code is None or isinstance(e.code, int): code = e.code or 0
+            else: print(e.code, file=sys.stderr); code = 1
+        except BaseException as e:
+            tb = e.__traceback__
+            while tb and tb.tb_frame.f_code.co_filename != request["path"]: tb = tb.tb_next
+            traceback.print_exception(type(e), e, tb or e.__traceback__); code = 1
+        try:
+            sys.stdout.flush(); sys.stderr.flush()
+        finally:
+            os._exit(code)
+    for fd in fds: os.close(fd)
+    sock.sendall(struct.pack("i", pid))
+    sock.sendall(struct.pack("i", os.waitstatus_to_exitcode(os.waitpid(pid, 0)[1])))
+'''
+
+class WarmPool:
+    def __init__(self, size, modules):
+        self.size, self.modules = size, modules
+        self.idle = []  # (proc, sock) workers waiting for a run
+        self.lock = Lock()
+
+    def start(self):
+        for _ in range(self.size): self.idle.append(self.spawn())
+        return self
+
+    def spawn(self):
+        ours, theirs = socket.socketpair()
+        proc = subprocess.Popen([sys.executable, "-c", WARM_WORKER, str(theirs.fileno()), *self.modules],
+                                pass_fds=(theirs.fileno(),), stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                                stderr=subprocess.DEVNULL, start_new_session=True)
+        theirs.close()
+        return proc, ours
+
+    @staticmethod
+    def receive(sock):
+        data = sock.recv(4, socket.MSG_WAITALL)
+        if len(data) < 4: raise OSError("warm worker exited")
+        return struct.unpack("i", data)[0]
+
+    def take(self):
+        with self.lock:
+            while self.idle:
+                worker = self.idle.pop()
+                if worker[0].poll() is None: return worker
+                worker[1].close()
+                self.idle.insert(0, self.spawn())
+
+    def release(self, worker):
+        with self.lock: self.idle.append(worker)
+
+    def discard(self, worker):
+        worker[1].close()
+        worker[0].kill()
+        self.release(self.spawn())
+
+    # returns None when every worker is busy, so the caller can fall back to a cold start
+    def launch(self, path, cwd, limits=()):
+        worker = self.take()
+        if worker is None: return None
+        out_r, out_w = os.pipe()
+        err_r, err_w = os.pipe()
+        try:
+            socket.send_fds(worker[1], [json.dumps({"path": path, "cwd": cwd, "limits": list(limits)}).encode()], [out_w, err_w])
+            pid = self.receive(worker[1])
+        except OSError:
+            os.close(out_r), os.close(err_r)
+            self.discard(worker)
+            return None
+        finally:
+            os.close(out_w), os.close(err_w)
+        return WarmProcess(self, worker, pid, os.fdopen(out_r, "rb"), os.fdopen(err_r, "rb"))
+
+    def stop(self):
+        with self.lock: workers, self.idle = self.idle, []
+        for proc, sock in workers:
+            sock.close()
+            proc.kill()
+
+# Popen look-alike for a run forked by a warm worker; the worker reports the exit status over its socket
+class WarmProcess:
+    def __init__(self, pool, worker, pid, stdout, stderr):
+        self.pool, self.worker, self.pid, self.stdout, self.stderr = pool, worker, pid, stdout, stderr
+        self.returncode = None
+        self.lock = Lock()
+
+    def poll(self):
+        try:
+            return self.wait(0)
+        except subprocess.TimeoutExpired:
+            return None
+
+    def wait(self, timeout=None):
+        if not self.lock.acquire(timeout=-1 if timeout is None else timeout):
+            raise subprocess.TimeoutExpired(self.pid, timeout)
+        try:
+            if self.returncode is None:
+                if not select.select([self.worker[1]], [], [], timeout)[0]: raise subprocess.TimeoutExpired(self.pid, timeout)
+                try:
+                    self.returncode = self.pool.receive(self.worker[1])
+                except OSError:
+                    self.returncode = -signal.SIGKILL
+                    self.pool.discard(self.worker)
+                else:
+                    self.pool.release(self.worker)
+        finally:
+            self.lock.release()
+        return self.returncode
+
+# Every run is a job: queued until a slot under the concurrency cap frees up, then started
+class JobManager:
+    def __init__(self, prefs):
+        self.prefs = prefs  # max_jobs is read on every pump so a changed cap applies to queued jobs
+        self.jobs = OrderedDict()  # id -> ProcessRunner
+        self.ids = itertools.count(1)
+
+    def submit(self, job, name):
+        job.id, job.name = next(self.ids), name
+        self.jobs[job.id] = job
+        self.pump()
+        return job
+
+    def running(self):
+        return [job for job in self.jobs.values() if job.started and not job.finished.is_set()]
+
+    def pump(self):
+        free = max(1, self.prefs["max_jobs"]) - len(self.running())
+        for job in self.jobs.values():
+            if free <= 0: break
+            if not job.started and not job.finished.is_set():
+                job.start()
+                free -= 1
+
+    def remove(self, job_id):
+        return self.jobs.pop(job_id, None)
+
+    def stop_all(self):
+        for job in self.jobs.values(): job.stop()
+
+    # jobs run in their own sessions and the SIGKILL escalation threads die with the IDE, so on exit every
+    # job is stopped and any group still running after the grace period is killed here
+    def shutdown(self, grace=2):
+        running = self.running()
+        self.stop_all()
+        deadline = time.monotonic() + grace
+        for job in running:
+            if not job.finished.wait(max(0, deadline - time.monotonic())): job.signal_group(signal.SIGKILL)
+
+# --- Lexer ---
+class Lexer:
+    def __init__(self, config):
+        parts, self.blocks = [], {}
+        parts.append(r'(?P<comment>%s)' % config.get("comment", r'#.*$'))
+        for i, (opener, closer, tag) in enumerate(config.get("blocks", ())):
+            self.blocks[f"block{i}"] = (closer, tag)
+            parts.append(r'(?P<block%d>%s)' % (i, re.escape(opener)))
+        parts.append(r'(?P<string>".*?"|\'.*?\')')
+        for tag, words in (("keyword", config.get("keywords")), ("builtin", config.get("builtins"))):
+            if words:
+                words = sorted(words, key=len, reverse=True)
+                parts.append(r'(?P<%s>\b(?:%s)\b)' % (tag, "|".join(map(re.escape, words))))
+        parts.append(r'(?P<number>\b\d+\.?\d*\b)')
+        self.pattern = re.compile("|".join(parts))
+
+    # state is None or the (closer, tag) of the block construct still open at end of line
+    def tokenize(self, line, state):
+        spans, pos = [], 0
+        if state:
+            closer, tag = state
+            close = line.find(closer)
+            if close < 0: return [(tag, 0, len(line))], state
+            pos = close + len(closer)
+            spans.append((tag, 0, pos))
+        search = self.pattern.search
+        m = search(line, pos)
+        while m:
+            tag, end = m.lastgroup, m.end()
+            block = self.blocks.get(tag)
+            if block:
+                closer, tag = block
+                close = line.find(closer, end)
+                if close < 0:
+                    spans.append((tag, m.start(), len(line)))
+                    return spans, block
+                end = close + len(closer)
+            spans.append((tag, m.start(), end))
+            m = search(line, end)
+        return spans, None
+
 class VSCodelikeIDE(tk.Tk):
     def __init__(self):
         super().__init__()
@@ -37,6 +1257,26 @@ class VSCodelikeIDE(tk.Tk):
         self.server_thread = None
         self.server_port = 8000
         self.settings = self.load_default_settings()
+        self.doc = None
+        self.tabs = {}
+        self.editors = OrderedDict()
+        self.current_tab = None
+        self.hl_states = None
+        self.hl_dirty = None
+        self.hl_generation = 0
+        self.hl_job = None
+        self.hl_viewport = False
+        self.prefs = self.load_default_prefs()
+        self.prefs.update(self.read_config().get("prefs", {}))
+        self.scheduler = Scheduler(self)
+        self.saver = SaveService(self)
+        self.tk_wide = int(self.tk.call("string", "length", "\U0001F600")) == 2
+        self.watcher = None
+        self.search = self.search_win = self.index = None
+        self.jobs = JobManager(self.prefs)
+        self.job_views = {}  # job id -> {"pane", "spill", "label", "done"}
+        self.warm_pool = WarmPool(self.prefs["warm_workers"], self.prefs["warm_modules"]).start() if self.prefs["warm_workers"] else None
+        self.build_cache = BuildCache(user_cache_dir("builds"), self.prefs)
         self.lang_var = tk.StringVar(value="Python")
         
         self.lang_configs = self.load_language_configs()
@@ -45,23 +1285,26 @@ class VSCodelikeIDE(tk.Tk):
         self.dialog_set_theme()  # Corrected method name
         self.create_folder_explorer()
         self.create_main_area()
+        self.create_find_bar()
+        self.output_tick()
         self.create_menu()
         self.create_toolbar()
         self.create_status_bar()
-        self.configure_syntax_highlighting()
         
         self.load_last_state()
-        if not self.files: self.new_file()
+        if not self.tabs: self.new_file()
         self.update_folder_explorer()
         self.setup_keybindings()
+        self.protocol("WM_DELETE_WINDOW", self.on_closing)
 
     # --- Language Configurations ---
     def load_language_configs(self):    #ne-roboaet-compiler-blet(    
-        return {
+        configs = {
         "python": {
             "ext": ".py",
             "keywords": ["def", "if", "else", "for", "while", "import", "class", "try", "except", "with"],
             "comment": r'#.*$',
+            "blocks": [('"""', '"""', "string"), ("'''", "'''", "string")],
             "runner": [sys.executable, "{file}"],
             "builtins": ["print", "len", "range", "input"]
         },
@@ -69,13 +1312,15 @@ class VSCodelikeIDE(tk.Tk):
             "ext": ".js",
             "keywords": ["function", "if", "else", "for", "let", "const", "var", "return", "async", "await"],
             "comment": r'//.*$',
+            "blocks": [("/*", "*/", "comment")],
             "runner": ["node", "{file}"],
             "builtins": ["console.log", "alert", "fetch"]
         },
         "html": {
             "ext": ".html",
             "keywords": ["html", "head", "body", "div", "script", "style", "title", "p", "a", "img"],
-            "comment": r'<!--[\s\S]*?-->',
+            "comment": r'<!--.*?-->',
+            "blocks": [("<!--", "-->", "comment")],
             "runner": None,
             "builtins": []
         },
@@ -83,24 +1328,34 @@ class VSCodelikeIDE(tk.Tk):
             "ext": ".java",
             "keywords": ["public", "class", "static", "void", "if", "else", "for", "int", "new", "return"],
             "comment": r'//.*$',
-            "runner": ["sh", "-c", "javac {file} && java {class}"],
+            "blocks": [("/*", "*/", "comment")],
+            "build": ["javac", "{flags}", "-d", "{out}", "{file}"],
+            "run": ["java", "-cp", "{out}", "{class}"],
             "builtins": ["System.out.println", "Math.random"]
         },
         "c": {
             "ext": ".c",
             "keywords": ["int", "float", "if", "else", "for", "while", "return", "void", "struct", "char"],
             "comment": r'//.*$',
-            "runner": ["sh", "-c", "gcc {file} -o a.out && ./a.out"],
+            "blocks": [("/*", "*/", "comment")],
+            "build": ["gcc", "{flags}", "{file}", "-o", "{out}"],
+            "run": ["{out}"],
             "builtins": ["printf", "scanf"]
         },
         "cpp": {
             "ext": ".cpp",
             "keywords": ["int", "float", "if", "else", "for", "while", "return", "class", "public", "private"],
             "comment": r'//.*$',
-            "runner": ["sh", "-c", "g++ {file} -o a.out && ./a.out"],
+            "blocks": [("/*", "*/", "comment")],
+            "build": ["g++", "{flags}", "{file}", "-o", "{out}"],
+            "run": ["{out}"],
             "builtins": ["cout", "cin"]
         }
     }
+        for config in configs.values():
+            config["lexer"] = Lexer(config)
+        return configs
+
     # --- Settings ---
     def load_default_settings(self):
         return {
@@ -116,6 +1371,16 @@ class VSCodelikeIDE(tk.Tk):
                      "Open Last": ["On", "Off", "Folder", "File", "Both", "None", "Recent", "Pinned", "Custom", "Smart"], "File Extensions": ["Show", "Hide", "Custom", "Minimal", "Full", "Auto", "Smart", "None", "Icons", "Text"]},
         }
 
+    def load_default_prefs(self):
+        return {"viewport_highlight_lines": 20000, "editor_pool_size": 4, "background_load_bytes": 1 << 20,
+                "large_file_bytes": 64 << 20,
+                "explorer_ignore": [".git", "node_modules", "__pycache__", ".venv", "*.pyc"], "search_result_limit": 2000,
+                "search_workers": 8, "search_index": True, "index_max_bytes": 4 << 20,
+                "run_timeout": 0, "output_max_lines": 10000, "output_spill": False,
+                "build_flags": {"c": ["-O2"], "cpp": ["-O2"], "java": []}, "build_cache_bytes": 256 << 20,
+                "warm_workers": 0, "warm_modules": [], "max_jobs": 4, "run_history": 10, "job_cpu_seconds": 300,
+                "job_memory_bytes": 0}
+
     # --- Set Theme for Dialogs ---
     def dialog_set_theme(self):
         self.option_add("*Background", "#1e1e1e")
@@ -137,6 +1402,7 @@ class VSCodelikeIDE(tk.Tk):
         self.folder_tree = ttk.Treeview(self.explorer_frame, show="tree", selectmode="browse", style="Dark.Treeview")
         self.folder_tree.pack(fill="both", expand=True)
         self.folder_tree.bind("<Double-1>", self.open_from_explorer)
+        self.folder_tree.bind("<<TreeviewOpen>>", self.on_tree_open)
 
     def create_menu(self):
         menubar = tk.Menu(self, bg="#2d2d2d", fg="white", activebackground="#3c3c3c", activeforeground="white")
@@ -155,8 +1421,8 @@ class VSCodelikeIDE(tk.Tk):
         
         edit_menu = tk.Menu(menubar, tearoff=0, bg="#2d2d2d", fg="white", activebackground="#3c3c3c", activeforeground="white")
         menubar.add_cascade(label="Edit", menu=edit_menu)
-        edit_menu.add_command(label="Undo", command=self.text.edit_undo, accelerator="Ctrl+Z")
-        edit_menu.add_command(label="Redo", command=self.text.edit_redo, accelerator="Ctrl+Y")
+        edit_menu.add_command(label="Undo", command=lambda: self.text.edit_undo(), accelerator="Ctrl+Z")
+        edit_menu.add_command(label="Redo", command=lambda: self.text.edit_redo(), accelerator="Ctrl+Y")
         edit_menu.add_command(label="Cut", command=lambda: self.text.event_generate("<<Cut>>"), accelerator="Ctrl+X")
         edit_menu.add_command(label="Copy", command=lambda: self.text.event_generate("<<Copy>>"), accelerator="Ctrl+C")
         edit_menu.add_command(label="Paste", command=lambda: self.text.event_generate("<<Paste>>"), accelerator="Ctrl+V")
@@ -167,12 +1433,18 @@ class VSCodelikeIDE(tk.Tk):
         run_menu = tk.Menu(menubar, tearoff=0, bg="#2d2d2d", fg="white", activebackground="#3c3c3c", activeforeground="white")
         menubar.add_cascade(label="Run", menu=run_menu)
         run_menu.add_command(label="Run Code", command=self.run_code, accelerator="F5")
+        run_menu.add_command(label="Stop", command=self.stop_run, accelerator="Shift+F5")
         run_menu.add_command(label="Debug", command=self.debug_code, accelerator="F10")
         run_menu.add_command(label="Start Live Server", command=self.start_live_server, accelerator="F6")
         
         settings_menu = tk.Menu(menubar, tearoff=0, bg="#2d2d2d", fg="white", activebackground="#3c3c3c", activeforeground="white")
         menubar.add_cascade(label="Settings", menu=settings_menu)
         settings_menu.add_command(label="Open Settings", command=self.open_settings)
+        settings_menu.add_separator()
+        self.perf_var = tk.BooleanVar(value=PERF.enabled)
+        settings_menu.add_checkbutton(label="Record Performance", variable=self.perf_var, command=lambda: setattr(PERF, "enabled", self.perf_var.get()))
+        settings_menu.add_command(label="Performance Panel", command=self.open_perf_panel)
+        settings_menu.add_command(label="Export Performance Stats", command=self.export_perf_stats)
 
     def create_toolbar(self):
         toolbar = ttk.Frame(self, padding=5, relief="flat", style="Dark.TFrame")
@@ -195,28 +1467,45 @@ class VSCodelikeIDE(tk.Tk):
         self.tab_bar.bind("<<NotebookTabChanged>>", self.switch_tab)
         self.tab_bar.bind("<Button-3>", self.show_tab_context_menu)
         
-        main_frame = ttk.Frame(self, style="Dark.TFrame")
+        self.main_frame = main_frame = ttk.Frame(self, style="Dark.TFrame")
         main_frame.pack(fill="both", expand=True, padx=5, pady=5)
         
-        self.line_numbers = tk.Text(main_frame, width=4, bg="#252526", fg="gray", font=("Consolas", 12), state="disabled", bd=0)
+        self.gutter_font = tkfont.Font(family="Consolas", size=12)
+        self.line_numbers = tk.Canvas(main_frame, width=40, bg="#252526", bd=0, highlightthickness=0)
         self.line_numbers.pack(side="left", fill="y")
         self.line_numbers.bind("<Double-1>", self.toggle_fold_at_line)
+        self.line_numbers.bind("<Configure>", lambda e: self.update_line_numbers())
         
-        self.text = tk.Text(main_frame, wrap="none", undo=True, bg="#1e1e1e", fg="white", insertbackground="white",
-                           font=("Consolas", 12), borderwidth=0, relief="flat")
-        self.text.pack(side="left", fill="both", expand=True)
-        
-        v_scroll = ttk.Scrollbar(main_frame, orient="vertical", command=self.on_v_scroll, style="Dark.Vertical.TScrollbar")
+        self.v_scroll = v_scroll = ttk.Scrollbar(main_frame, orient="vertical", command=self.on_v_scroll, style="Dark.Vertical.TScrollbar")
         v_scroll.pack(side="right", fill="y")
-        h_scroll = ttk.Scrollbar(main_frame, orient="horizontal", command=self.text.xview, style="Dark.Horizontal.TScrollbar")
+        self.h_scroll = h_scroll = ttk.Scrollbar(main_frame, orient="horizontal", command=lambda *args: self.text.xview(*args), style="Dark.Horizontal.TScrollbar")
         h_scroll.pack(side="bottom", fill="x")
-        self.text.config(yscrollcommand=v_scroll.set, xscrollcommand=h_scroll.set)
-        self.line_numbers.config(yscrollcommand=v_scroll.set)
+        self.text = self.create_editor()
+        self.text.pack(side="left", fill="both", expand=True, before=v_scroll)
         
-        self.output_frame = ttk.LabelFrame(self, text="Output", padding=5, style="Dark.TLabelframe")
+        self.output_frame = ttk.LabelFrame(self, text="Runs", padding=5, style="Dark.TLabelframe")
         self.output_frame.pack(fill="x", padx=5, pady=5)
-        self.output = tk.Text(self.output_frame, height=12, bg="#1e1e1e", fg="lime", font=("Consolas", 10), state="disabled", bd=0)
-        self.output.pack(fill="x")
+        bar = ttk.Frame(self.output_frame, style="Dark.TFrame")
+        bar.pack(fill="x")
+        self.run_status = ttk.Label(bar, style="Dark.TLabel")
+        self.run_status.pack(side="left")
+        self.stop_button = ttk.Button(bar, text="■ Stop", command=self.stop_run, state="disabled", style="Dark.TButton")
+        self.stop_button.pack(side="right")
+        self.log_button = ttk.Button(bar, text="Full Log", command=self.open_output_log, state="disabled", style="Dark.TButton")
+        self.log_button.pack(side="right", padx=5)
+        self.close_run_button = ttk.Button(bar, text="Close", command=self.close_job, state="disabled", style="Dark.TButton")
+        self.close_run_button.pack(side="right")
+        self.run_tabs = ttk.Notebook(self.output_frame, style="Dark.TNotebook")
+        self.run_tabs.pack(fill="x")
+        self.run_tabs.bind("<<NotebookTabChanged>>", lambda e: self.update_run_bar())
+        self.output = self.create_output_pane("Output")
+
+    def create_output_pane(self, title):
+        pane = tk.Text(self.run_tabs, height=12, bg="#1e1e1e", fg="lime", font=("Consolas", 10), state="disabled", bd=0)
+        pane.tag_configure("stderr", foreground="#ff5555")
+        pane.tag_configure("info", foreground="gray")
+        self.run_tabs.add(pane, text=title)
+        return pane
 
     def create_status_bar(self):
         self.status_bar = ttk.Frame(self, relief="flat", padding=2, style="Dark.TFrame")
@@ -227,16 +1516,38 @@ class VSCodelikeIDE(tk.Tk):
         self.lang_label.pack(side="left")
         self.line_col_label = ttk.Label(self.status_bar, text="Ln 1, Col 1", anchor="e", style="Dark.TLabel")
         self.line_col_label.pack(side="right", padx=5)
+        self.watch_label = ttk.Label(self.status_bar, text="", anchor="e", style="Dark.TLabel")
+        self.watch_label.pack(side="right", padx=5)
+
+    def create_editor(self):
+        text = tk.Text(self.main_frame, wrap="none", undo=True, bg="#1e1e1e", fg="white", insertbackground="white",
+                       font=("Consolas", 12), borderwidth=0, relief="flat")
+        self.install_edit_hook(text)
+        self.configure_syntax_highlighting(text)
+        text.config(yscrollcommand=lambda first, last: text is self.text and self.on_text_scroll(first, last),
+                    xscrollcommand=lambda first, last: text is self.text and self.h_scroll.set(first, last))
+        text.bind("<Configure>", lambda e: self.update_line_numbers())
+        text.bind("<<Modified>>", lambda e: text.edit_modified() and text.cget("state") == "normal" and self.set_modified(True))
+        text.bind("<KeyPress>", self.on_key_press)
+        text.bind("<KeyRelease>", self.on_key_release)
+        return text
+
+    def destroy_editor(self, text):
+        name = text._w
+        text.destroy()
+        self.tk.deletecommand(name)
 
-    def configure_syntax_highlighting(self):
-        self.text.tag_configure("keyword", foreground="#569cd6")
-        self.text.tag_configure("number", foreground="#b5cea8")
-        self.text.tag_configure("string", foreground="#ce9178")
-        self.text.tag_configure("comment", foreground="#6a9955")
-        self.text.tag_configure("builtin", foreground="#dcdcaa")
-        self.text.tag_configure("breakpoint", background="#ff5555")
-        self.text.tag_configure("search", background="yellow")
-        self.text.tag_configure("folded", foreground="gray")
+    def configure_syntax_highlighting(self, text):
+        text.tag_configure("keyword", foreground="#569cd6")
+        text.tag_configure("number", foreground="#b5cea8")
+        text.tag_configure("string", foreground="#ce9178")
+        text.tag_configure("comment", foreground="#6a9955")
+        text.tag_configure("builtin", foreground="#dcdcaa")
+        text.tag_configure("breakpoint", background="#ff5555")
+        text.tag_configure("search", background="yellow")
+        text.tag_configure("search_current", background="orange", foreground="black")
+        text.tag_raise("search_current")
+        text.tag_configure("folded", foreground="gray")
 
     # --- Keybindings ---
     def setup_keybindings(self):
@@ -246,7 +1557,7 @@ class VSCodelikeIDE(tk.Tk):
             "<Control-w>": lambda e: self.close_tab(), "<Control-z>": lambda e: self.text.edit_undo(),
             "<Control-y>": lambda e: self.text.edit_redo(), "<Control-f>": lambda e: self.find_text(),
             "<Control-h>": lambda e: self.replace_text(), "<Control-Shift-f>": lambda e: self.find_in_files(),
-            "<F5>": lambda e: self.run_code(), "<F10>": lambda e: self.debug_code(),
+            "<F5>": lambda e: self.run_code(), "<Shift-F5>": lambda e: self.stop_run(), "<F10>": lambda e: self.debug_code(),
             "<F6>": lambda e: self.start_live_server(), "<Control-d>": lambda e: self.toggle_breakpoint(),
             "<KeyRelease-exclam>": lambda e: self.check_html_emmet()
         }
@@ -255,70 +1566,246 @@ class VSCodelikeIDE(tk.Tk):
 
     # --- Core Functionality ---
     def on_v_scroll(self, *args):
+        data = self.tabs.get(self.current_tab)
+        if data and data.get("last_line") and args[0] == "moveto":
+            top = int(float(args[1]) * data["mapped"].lines) + 1
+            if not data["first_line"] <= top <= data["last_line"] - 100: return self.show_page(self.text, data, top)
+            args = (f"{top - data['first_line'] + 1}.0",)
         self.text.yview(*args)
+
+    def on_text_scroll(self, first, last):
+        data = self.tabs.get(self.current_tab)
+        if data and data.get("last_line"):
+            first, last, lines = float(first), float(last), data["last_line"] - data["first_line"] + 1
+            if first < 0.05 and data["first_line"] > 1 or last > 0.95 and data["last_line"] < data["mapped"].lines:
+                self.scheduler.schedule("page", self.repage)
+            total, skipped = data["mapped"].lines, data["first_line"] - 1
+            first, last = (skipped + first * lines) / total, (skipped + last * lines) / total
+        self.v_scroll.set(first, last)
         self.update_line_numbers()
+        if self.hl_viewport:
+            self.scheduler.schedule("highlight", self.highlight_syntax)
 
+    @PERF.timed("update_line_numbers")
     def update_line_numbers(self):
-        self.line_numbers.config(state="normal")
-        self.line_numbers.delete("1.0", "end")
-        lines = self.text.get("1.0", "end-1c").count("\n") + 1
-        for i in range(1, lines + 1):
-            tag = "breakpoint" if f"{i}.0" in self.breakpoints else ""
-            if f"{i}.0" in self.folded_blocks.get(self.filename, {}):
-                self.line_numbers.insert("end", f"{i} ▶\n", tag)
-            else:
-                self.line_numbers.insert("end", f"{i}\n", tag)
-        self.line_numbers.config(state="disabled")
-        self.line_numbers.yview_moveto(self.text.yview()[0])
+        gutter = self.line_numbers
+        gutter.delete("all")
+        last = self.line_of("end-1c")
+        skipped = self.tabs.get(self.current_tab, {}).get("first_line", 1) - 1
+        width = self.gutter_font.measure("0" * len(str(last + skipped))) + 28
+        if int(gutter.cget("width")) != width: gutter.config(width=width)
+        folded = self.folded_blocks.get(self.filename, {})
+        line = self.line_of("@0,0")
+        while line <= last:
+            info = self.text.dlineinfo(f"{line}.0")
+            if not info: break
+            y, height = info[1], info[3]
+            if f"{line}.0" in self.breakpoints:
+                gutter.create_oval(4, y + height // 2 - 4, 12, y + height // 2 + 4, fill="#ff5555", outline="")
+            gutter.create_text(width - 16, y, anchor="ne", text=str(line + skipped), fill="gray", font=self.gutter_font)
+            if f"{line}.0" in folded:
+                gutter.create_text(width - 2, y, anchor="ne", text="▶", fill="gray", font=self.gutter_font)
+            line += 1
+
+    def on_key_press(self, event=None):
+        if not PERF.enabled: return
+        start = time.perf_counter()
+        self.after_idle(lambda: self.after_idle(lambda: PERF.record("keystroke", time.perf_counter() - start)))
 
     def on_key_release(self, event=None):
-        self.highlight_syntax()
-        self.update_line_numbers()
         self.update_status()
+        self.update_line_numbers()
+        self.scheduler.schedule("highlight", self.highlight_syntax, delay=30)
         if time.time() - self.last_run_time > 1.0:
-            self.live_preview()
-        self.after(2000, self.auto_save)
+            self.scheduler.schedule("preview", self.live_preview, delay=1000, priority=1)
+        self.scheduler.schedule("auto_save", self.auto_save, delay=2000, priority=2)
+        if self.doc is not None and self.doc.revision != self.find_revision: self.schedule_find(jump=False)
+
+    # --- Edit Tracking ---
+    def install_edit_hook(self, widget):
+        orig = widget._w + "_orig"
+        self.tk.call("rename", widget._w, orig)
+        def proxy(*args):
+            if args and args[0] in ("insert", "delete", "replace"):
+                return self.on_text_edit(widget, orig, args)
+            return self.tk.call((orig,) + args)
+        self.tk.createcommand(widget._w, proxy)
+
+    def on_text_edit(self, widget, orig, args):
+        call = lambda *a: self.tk.call((orig,) + a)
+        if widget is not self.text: return call(*args)
+        end = str(call("index", "end-1c"))
+        clamp = lambda index: end if self.tk.getboolean(call("compare", index, ">", end)) else str(call("index", index))
+        op, start = args[0], clamp(args[1])
+        stop = start if op == "insert" else clamp(args[2]) if len(args) > 2 else clamp(f"{start}+1c")
+        doc, ranges = self.doc, op == "delete" and len(args) > 3
+        if doc is not None and not ranges:
+            a = self.doc_offset(call, start)
+            b = self.doc_offset(call, stop) if stop != start else a
+        before, first = int(end.split(".")[0]), int(start.split(".")[0])
+        result = call(*args)
+        if doc is not None:
+            if ranges:
+                doc.reset(str(call("get", "1.0", "end-1c")))
+            else:
+                doc.delete(a, b)
+                doc.insert(a, "".join(args[3::2] if op == "replace" else args[2::2] if op == "insert" else ()))
+        delta = int(str(call("index", "end-1c")).split(".")[0]) - before
+        self.hl_generation += 1
+        if self.hl_states is not None:
+            if delta > 0: self.hl_states[first:first] = [None] * delta
+            elif delta < 0: del self.hl_states[first:first - delta]
+        last = first + max(delta, 0)
+        if self.hl_dirty:
+            lo, hi = self.hl_dirty
+            if hi > first: hi = max(first, hi + delta)
+            self.hl_dirty = (min(lo, first), max(hi, last))
+        else:
+            self.hl_dirty = (first, last)
+        return result
+
+    # Tk columns count a non-BMP character as two on Tcl 8.6, so the column is measured on the widget's own text
+    def doc_offset(self, call, index):
+        line, col = index.split(".")
+        return self.doc.offset(int(line), len(str(call("get", f"{line}.0", index))) if col != "0" else 0)
 
+    # --- Syntax Highlighting ---
+    def line_of(self, index):
+        return int(self.text.index(index).split(".")[0])
+
+    def mark_dirty(self, first, last):
+        if self.hl_dirty: first, last = min(first, self.hl_dirty[0]), max(last, self.hl_dirty[1])
+        self.hl_dirty = (first, last)
+
+    def visible_lines(self, margin=0):
+        top = self.line_of("@0,0") - margin
+        bottom = self.line_of(f"@0,{self.text.winfo_height()}") + margin
+        return max(1, top), min(self.line_of("end-1c"), bottom)
+
+    @PERF.timed("highlight_syntax")
     def highlight_syntax(self):
-        data = self.text.get("1.0", "end-1c")
-        for tag in ("keyword", "number", "string", "comment", "builtin"):
-            self.text.tag_remove(tag, "1.0", "end")
-        
-        config = self.lang_configs.get(self.language, {})
-        keywords = config.get("keywords", [])
-        builtins = config.get("builtins", [])
-        
-        for word in keywords:
-            start = "1.0"
-            while True:
-                pos = self.text.search(r'\m' + word + r'\M', start, stopindex="end", regexp=True)
-                if not pos: break
-                self.text.tag_add("keyword", pos, f"{pos}+{len(word)}c")
-                start = f"{pos}+{len(word)}c"
-        
-        for word in builtins:
-            start = "1.0"
-            while True:
-                pos = self.text.search(r'\m' + word + r'\M', start, stopindex="end", regexp=True)
-                if not pos: break
-                self.text.tag_add("builtin", pos, f"{pos}+{len(word)}c")
-                start = f"{pos}+{len(word)}c"
-        
-        for match in re.finditer(r'\b\d+\.?\d*\b', data):
-            self.text.tag_add("number", f"1.0+{match.start()}c", f"1.0+{match.end()}c")
-        
-        for match in re.finditer(r'".*?"|\'.*?\'', data):
-            self.text.tag_add("string", f"1.0+{match.start()}c", f"1.0+{match.end()}c")
-        
-        comment_pat = config.get("comment", r'#.*$')
-        for match in re.finditer(comment_pat, data, re.MULTILINE):
-            self.text.tag_add("comment", f"1.0+{match.start()}c", f"1.0+{match.end()}c")
+        last = self.line_of("end-1c")
+        if self.hl_job and self.hl_job != self.hl_generation:
+            self.mark_dirty(self.line_of("hl_pending"), last)
+            self.hl_job = None
+        if self.hl_states is None or len(self.hl_states) != last + 1:
+            self.hl_states = [None] + [UNSEEN] * last
+            self.hl_dirty = (1, last)
+        lo, hi = (min(self.hl_dirty[0], last), min(self.hl_dirty[1], last)) if self.hl_dirty else (last + 1, 0)
+        self.hl_dirty = None
+        top, bottom = 1, last
+        self.hl_viewport = last > self.prefs["viewport_highlight_lines"]
+        if self.hl_viewport:
+            top, bottom = self.visible_lines(HL_VIEWPORT_MARGIN)
+            for a, b in ((lo, min(hi, top - 1)), (max(lo, bottom + 1), hi)):
+                if a <= b: self.hl_states[a:b + 1] = [UNSEEN] * (b - a + 1)
+            unseen = [i for i in range(top, bottom + 1) if self.hl_states[i] is UNSEEN]
+            lo, hi = min([max(lo, top)] + unseen[:1]), max([min(hi, bottom)] + unseen[-1:])
+        if lo > hi: return
+        lexer = self.lang_configs.get(self.language, self.lang_configs["python"])["lexer"]
+        budget = bottom - top if self.hl_viewport else HL_SYNC_LINES
+        if hi - lo > budget:
+            return self.start_highlight_job(lexer, lo, bottom)
+        state = self.hl_states[lo - 1]
+        if state is UNSEEN: state = None
+        ranges, lines, states, line = {tag: [] for tag in TOKEN_TAGS}, [], [], lo
+        while line <= bottom and line - lo <= budget:
+            if not lines:
+                end = min(max(hi, line + 63), bottom)
+                lines = self.text.get(f"{line}.0", f"{end}.end").split("\n")[::-1]
+            spans, state = lexer.tokenize(lines.pop(), state)
+            for tag, start, end in spans:
+                ranges[tag] += (f"{line}.{start}", f"{line}.{end}")
+            states.append(state)
+            if line >= hi and self.hl_states[line] == state: break
+            line += 1
+        self.apply_highlight(lo, lo + len(states) - 1, ranges)
+        self.store_states(lo, states)
+        if line - lo > budget and line <= bottom: self.start_highlight_job(lexer, line, bottom)
+
+    # re-lexes only the given lines; a line whose end state changes hands the rest to normal propagation
+    def rehighlight_lines(self, lines):
+        lexer = self.lang_configs.get(self.language, self.lang_configs["python"])["lexer"]
+        ranges, cleared = {tag: [] for tag in TOKEN_TAGS}, []
+        for line in lines:
+            state = self.hl_states[line - 1]
+            if state is UNSEEN or self.hl_states[line] is UNSEEN:
+                self.mark_dirty(line, line)
+                continue
+            spans, state = lexer.tokenize(self.text.get(f"{line}.0", f"{line}.end"), state)
+            cleared += (f"{line}.0", f"{line}.end")
+            for tag, start, end in spans:
+                ranges[tag] += (f"{line}.{start}", f"{line}.{end}")
+            if state != self.hl_states[line]:
+                self.hl_states[line] = state
+                if line + 1 < len(self.hl_states): self.mark_dirty(line + 1, line + 1)
+        for tag in TOKEN_TAGS:
+            if cleared: self.text.tk.call(self.text._w, "tag", "remove", tag, *cleared)
+        for tag, indices in ranges.items():
+            if indices: self.text.tag_add(tag, *indices)
+        if self.hl_dirty: self.highlight_syntax()
+
+    def store_states(self, lo, states):
+        hi = lo + len(states) - 1
+        old = self.hl_states[hi]
+        self.hl_states[lo:hi + 1] = states
+        if hi + 1 < len(self.hl_states) and old is not UNSEEN and old != states[-1]:
+            self.hl_states[hi + 1:] = [UNSEEN] * (len(self.hl_states) - hi - 1)
+
+    def apply_highlight(self, first, last, ranges):
+        for tag in TOKEN_TAGS:
+            self.text.tag_remove(tag, f"{first}.0", f"{last}.end")
+        for tag, indices in ranges.items():
+            if indices: self.text.tag_add(tag, *indices)
+
+    def start_highlight_job(self, lexer, lo, hi):
+        if self.hl_job: lo = min(lo, self.line_of("hl_pending"))
+        self.hl_generation += 1
+        self.hl_job = self.hl_generation
+        self.text.mark_set("hl_pending", f"{lo}.0")
+        self.text.mark_gravity("hl_pending", "left")
+        state = self.hl_states[lo - 1]
+        snapshot = self.doc.snapshot() if self.doc else PieceTable(self.text.get("1.0", "end-1c"))
+        Thread(target=self.run_highlight_job, args=(self.hl_generation, lexer, lo, hi, None if state is UNSEEN else state, snapshot), daemon=True).start()
+
+    def run_highlight_job(self, generation, lexer, lo, hi, state, snapshot):
+        chunks, states, first, count = [], [], lo, 0
+        ranges = {tag: [] for tag in TOKEN_TAGS}
+        for line, text in enumerate(snapshot.lines(lo, hi).split("\n"), lo):
+            if generation != self.hl_generation: return
+            spans, state = lexer.tokenize(text, state)
+            states.append(state)
+            for tag, start, end in spans:
+                ranges[tag] += (f"{line}.{start}", f"{line}.{end}")
+            count += len(spans)
+            if count >= HL_CHUNK_SPANS:
+                chunks.append((first, line, ranges))
+                ranges, first, count = {tag: [] for tag in TOKEN_TAGS}, line + 1, 0
+        chunks.append((first, lo + len(states) - 1, ranges))
+        self.after(0, lambda: self.finish_highlight_job(generation, lo, states, chunks))
+
+    def finish_highlight_job(self, generation, lo, states, chunks):
+        if generation != self.hl_generation: return self.scheduler.schedule("highlight", self.highlight_syntax)
+        self.store_states(lo, states)
+        self.apply_highlight_chunk(generation, chunks, 0)
+
+    def apply_highlight_chunk(self, generation, chunks, i):
+        if generation != self.hl_generation: return self.scheduler.schedule("highlight", self.highlight_syntax)
+        first, last, ranges = chunks[i]
+        if first <= last: self.apply_highlight(first, last, ranges)
+        if i + 1 < len(chunks):
+            self.text.mark_set("hl_pending", f"{last + 1}.0")
+            self.after(1, self.apply_highlight_chunk, generation, chunks, i + 1)
+        else:
+            self.hl_job = None
+            self.text.mark_unset("hl_pending")
 
     def set_language(self, lang):
         self.language = lang.lower()
-        self.files[self.filename]["language"] = self.language
+        self.tabs[self.current_tab]["language"] = self.language
         self.lang_label.config(text=lang.capitalize())
         self.update_file_extension()
+        self.hl_states = None
         self.highlight_syntax()
         if self.language == "html" and self.server_thread:
             self.live_preview()
@@ -331,29 +1818,29 @@ class VSCodelikeIDE(tk.Tk):
             new_filename = os.path.splitext(self.filename)[0] + new_ext
             if os.path.exists(self.filename):
                 os.rename(self.filename, new_filename)
-            old_data = self.files.pop(self.filename)
-            self.files[new_filename] = old_data
-            self.filename = new_filename
+            data = self.tabs[self.current_tab]
+            if self.files.get(self.filename) is data: del self.files[self.filename]
+            self.files[new_filename] = data
+            self.filename = data["path"] = new_filename
             self.tab_bar.tab(self.tab_bar.select(), text=os.path.basename(new_filename))
             self.save_file()
 
     def new_file(self):
-        self.files[None] = {"content": "", "modified": False, "language": self.lang_var.get().lower()}
-        self.tab_bar.add(ttk.Frame(self.tab_bar), text="Untitled")
-        self.tab_bar.select(self.tab_bar.index("end") - 1)
+        self.add_tab(None, PieceTable(), self.lang_var.get().lower())
+
+    def add_tab(self, path, doc, language):
+        tab = ttk.Frame(self.tab_bar)
+        # tab state lives in self.tabs; self.files only maps saved paths to their tab for lookups by path
+        data = self.tabs[str(tab)] = {"path": path, "doc": doc, "modified": False, "language": language, "tab": str(tab)}
+        if path: self.files[path] = data
+        self.tab_bar.add(tab, text=os.path.basename(path) if path else "Untitled")
+        self.tab_bar.select(tab)
         self.switch_tab()
+        return data
         
     def open_file(self):
         file = filedialog.askopenfilename(filetypes=[("All Files", "*.*")])
-        if file:
-            with open(file, "r", encoding="utf-8") as f:
-                content = f.read()
-            ext = os.path.splitext(file)[1]
-            lang = next((l for l, c in self.lang_configs.items() if c["ext"] == ext), "python")
-            self.files[file] = {"content": content, "modified": False, "language": lang}
-            self.tab_bar.add(ttk.Frame(self.tab_bar), text=os.path.basename(file))
-            self.tab_bar.select(self.tab_bar.index("end") - 1)
-            self.switch_tab()
+        if file: self.open_file_from_path(file)
 
     def open_folder(self):
         folder = filedialog.askdirectory()
@@ -362,61 +1849,123 @@ class VSCodelikeIDE(tk.Tk):
             os.chdir(folder)
             self.update_folder_explorer()
 
-    def save_file(self):
+    # then() runs on the Tk thread once the write has succeeded
+    def save_file(self, then=None):
+        if self.doc is None: return
         if not self.filename:
-            self.save_file_as()
+            self.save_file_as(then)
         else:
-            with open(self.filename, "w", encoding="utf-8") as f:
-                f.write(self.text.get("1.0", "end-1c"))
-            self.files[self.filename]["modified"] = False
-            self.tab_bar.tab(self.tab_bar.select(), text=os.path.basename(self.filename))
-            if self.language == "html" and self.server_thread:
-                self.live_preview()
-
-    def save_file_as(self):
+            data, revision = self.tabs[self.current_tab], self.doc.revision
+            self.saver.save(self.filename, self.doc.snapshot(), lambda error: self.on_saved(data, revision, error, then))
+
+    def on_saved(self, data, revision, error, then=None):
+        if error:
+            return messagebox.showerror("Save Failed", f"{data['path']}: {error}", parent=self)
+        if then: then()
+        if data["tab"] not in self.tabs or data["doc"].revision != revision: return
+        data["modified"] = False
+        editor = self.editors.get(data["tab"])
+        if editor is not None: editor.edit_modified(False)
+        self.tab_bar.tab(data["tab"], text=os.path.basename(data["path"]))
+        self.update_status()
+
+    def save_file_as(self, then=None):
         ext = self.lang_configs[self.language]["ext"]
         file = filedialog.asksaveasfilename(defaultextension=ext, filetypes=[("All Files", "*.*")])
         if file:
-            old_filename = self.filename
-            self.filename = file
-            self.save_file()
-            if old_filename is None:
-                self.files[file] = self.files.pop(None)
-            elif old_filename in self.files:
-                self.files[file] = self.files.pop(old_filename)
-            self.tab_bar.tab(self.tab_bar.select(), text=os.path.basename(file))
+            data = self.tabs[self.current_tab]
+            if self.files.get(self.filename) is data: del self.files[self.filename]
+            self.filename = data["path"] = file
+            self.files[file] = data
+            self.save_file(then)
 
     def auto_save(self):
-        if self.filename and self.files[self.filename]["modified"]:
+        if self.filename and self.tabs[self.current_tab]["modified"]:
             self.save_file()
 
     def close_tab(self):
         if not self.tab_bar.tabs(): return
         current = self.tab_bar.select()
-        fname = next(k for k, v in self.files.items() if self.tab_bar.tab(current, "text") in (os.path.basename(k) if k else "Untitled"))
-        if self.files[fname]["modified"] and not self.confirm_discard(): return
-        del self.files[fname]
-        self.tab_bar.forget(current)
-        if self.files: self.switch_tab()
+        data = self.tabs[current]
+        if data["modified"] and not self.confirm_discard(): return
+        self.forget_tab(current)
+        if self.tabs: self.switch_tab()
 
+    def forget_tab(self, tab):
+        data = self.tabs.pop(tab)
+        if data.get("loading"): data["loading"].set()
+        if data.get("mapped"): data["mapped"].close()
+        if self.files.get(data["path"]) is data: del self.files[data["path"]]
+        editor = self.editors.pop(tab, None)
+        if editor is not None and editor is not self.text: self.destroy_editor(editor)
+        self.tab_bar.forget(tab)
+
+    @PERF.timed("switch_tab")
     def switch_tab(self, event=None):
         if not self.tab_bar.tabs():
-            self.filename = None
+            self.filename = self.doc = self.current_tab = self.hl_states = None
             self.text.delete("1.0", "end")
             return
-        current = self.tab_bar.select()
-        fname = next(k for k, v in self.files.items() if self.tab_bar.tab(current, "text") in (os.path.basename(k) if k else "Untitled"))
-        self.filename = fname
-        self.language = self.files[fname]["language"]
+        tab = self.tab_bar.select()
+        data = self.tabs[tab]
+        previous = self.tabs.get(self.current_tab)
+        if previous is not None:
+            previous["view"] = (self.hl_states, self.hl_dirty, self.hl_viewport, self.hl_job)
+        self.doc = self.hl_states = self.hl_dirty = None
+        self.hl_generation += 1
+        # the previous tab's pending highlight and repage are superseded by the full pass below
+        self.scheduler.cancel("highlight")
+        self.scheduler.cancel("page")
+        self.current_tab = tab
+        self.filename = data["path"]
+        self.language = data["language"]
         self.lang_var.set(self.language.capitalize())
-        self.text.delete("1.0", "end")
-        content = self.files[fname]["content"]
-        for start, end in self.folded_blocks.get(fname, {}).items():
-            content = content[:int(start.split('.')[0])-1] + "[FOLDED]\n" + content[int(end.split('.')[0]):]
-        self.text.insert("1.0", content)
+        editor = self.editors.pop(tab, None)
+        if editor is None:
+            editor = self.load_editor(data)
+        else:
+            self.hl_states, self.hl_dirty, self.hl_viewport, self.hl_job = data.pop("view")
+        self.editors[tab] = editor
+        old = self.text
+        if editor is not old:
+            old.pack_forget()
+            editor.pack(side="left", fill="both", expand=True, before=self.v_scroll)
+            self.text = editor
+            if old not in self.editors.values(): self.destroy_editor(old)
+        self.doc = data["doc"]
+        self.evict_editors()
         self.highlight_syntax()
         self.update_line_numbers()
         self.update_status()
+        self.schedule_find(jump=False)
+
+    def load_editor(self, data):
+        editor = self.create_editor()
+        if data["doc"] is not None: editor.insert("1.0", data["doc"].text())
+        if data.get("last_line"): self.show_page(editor, data, data["first_line"] + PAGE_LINES // 4)
+        if data["doc"] is None: editor.config(state="disabled")
+        editor.edit_reset()
+        editor.edit_modified(False)
+        self.hl_states, self.hl_dirty, self.hl_viewport, self.hl_job = None, None, False, None
+        cache = data.pop("tokens", None)
+        if cache and data["doc"] and cache["key"] == data["doc"].revision and cache["language"] == data["language"]:
+            self.hl_states = cache["states"]
+            self.hl_viewport = len(self.hl_states) - 1 > self.prefs["viewport_highlight_lines"]
+            for tag, ranges in cache["tags"].items():
+                if ranges: editor.tag_add(tag, *ranges)
+        return editor
+
+    def evict_editors(self):
+        for tab in list(self.editors):
+            if len(self.editors) <= max(1, self.prefs["editor_pool_size"]): break
+            data = self.tabs[tab]
+            if tab == self.current_tab or data.get("loading"): continue
+            editor = self.editors.pop(tab)
+            states, dirty, viewport, job = data.pop("view")
+            if states is not None and not dirty and not job and data["doc"]:
+                data["tokens"] = {"key": data["doc"].revision, "language": data["language"], "states": states,
+                                  "tags": {tag: editor.tag_ranges(tag) for tag in TOKEN_TAGS}}
+            self.destroy_editor(editor)
 
     def show_tab_context_menu(self, event):
         menu = tk.Menu(self, tearoff=0, bg="#2d2d2d", fg="white", activebackground="#3c3c3c", activeforeground="white")
@@ -425,43 +1974,165 @@ class VSCodelikeIDE(tk.Tk):
         menu.tk_popup(event.x_root, event.y_root)
 
     def close_all_tabs(self):
-        for fname in list(self.files.keys()):
-            if self.files[fname]["modified"] and not self.confirm_discard(): return
-            del self.files[fname]
-            self.tab_bar.forget(0)
+        for tab in self.tab_bar.tabs():
+            if self.tabs[tab]["modified"] and not self.confirm_discard(): return
+            self.forget_tab(tab)
         self.switch_tab()
 
+    # --- Output Panel ---
+    def output_tick(self):
+        changed = finished = False
+        for job in list(self.jobs.jobs.values()):
+            view, done = self.job_views[job.id], job.finished.is_set()
+            self.drain_output(job.output, view["pane"], view["spill"])
+            label = f"#{job.id} {job.name} · {job.state}"
+            if label != view["label"]:
+                self.run_tabs.tab(view["pane"], text=label)
+                view["label"], changed = label, True
+            if done and not view["done"]:
+                view["done"] = finished = True
+                self.last_run_time = time.time()
+        if finished: self.prune_jobs()
+        self.jobs.pump()
+        if changed or self.jobs.running(): self.update_run_bar()
+        self.after(OUTPUT_FRAME_MS, self.output_tick)
+
+    # a pane holds at most output_max_lines; a burst larger than that only inserts its tail
+    def drain_output(self, chunks, output, spill=None):
+        if not chunks: return
+        pieces = []
+        while chunks: pieces.append(chunks.popleft())
+        if spill:
+            spill.write("".join(text for _, text in pieces))
+            spill.flush()
+        cap, kept, lines = self.prefs["output_max_lines"], [], 0
+        for stream, text in reversed(pieces):
+            lines += text.count("\n")
+            if lines > cap:
+                cut = len(text)
+                for _ in range(cap - lines + text.count("\n") + 1): cut = text.rfind("\n", 0, cut)
+                kept.append((stream, text[cut + 1:]))
+                break
+            kept.append((stream, text))
+        follow = output.yview()[1] >= 0.999
+        output.config(state="normal")
+        output.insert("end", *[arg for stream, text in reversed(kept) for arg in (text, (stream,))])
+        excess = int(output.index("end-1c").split(".")[0]) - cap
+        if excess > 0: output.delete("1.0", f"{excess + 1}.0")
+        output.config(state="disabled")
+        if follow: output.see("end")
+
+    def selected_job(self):
+        selected = self.run_tabs.select()
+        for job_id, view in self.job_views.items():
+            if str(view["pane"]) == selected: return self.jobs.jobs[job_id]
+
+    def update_run_bar(self):
+        job = self.selected_job()
+        view = self.job_views[job.id] if job else {}
+        if job is None: status = ""
+        elif not job.started: status = "Queued"
+        elif not job.finished.is_set(): status = f"Running (pid {job.pid})…" if job.pid else "Running…"
+        else: status = f"{job.state.capitalize()} after {job.elapsed:.2f}s"
+        self.run_status.config(text=status)
+        self.stop_button.config(state="normal" if job and not job.finished.is_set() else "disabled")
+        self.log_button.config(state="normal" if view.get("spill") else "disabled")
+        self.close_run_button.config(state="normal" if view.get("done") else "disabled")
+
+    def add_job(self, job, name):
+        self.jobs.submit(job, name)
+        pane = self.create_output_pane(f"#{job.id} {name}")
+        spill = None
+        if self.prefs["output_spill"]:
+            # the log lives as long as its pane: closing the handle in close_job deletes the file
+            spill = tempfile.NamedTemporaryFile("w", encoding="utf-8", prefix=f"litecode-run{job.id}-", suffix=".log")
+        self.job_views[job.id] = {"pane": pane, "spill": spill, "label": "", "done": False}
+        self.run_tabs.select(pane)
+
+    def close_job(self, job=None):
+        job = job or self.selected_job()
+        if job is None or not self.job_views[job.id]["done"]: return
+        self.jobs.remove(job.id)
+        view = self.job_views.pop(job.id)
+        if view["spill"]: view["spill"].close()
+        self.run_tabs.forget(view["pane"])
+        view["pane"].destroy()
+        self.update_run_bar()
+
+    # finished panes beyond run_history are closed oldest first
+    def prune_jobs(self):
+        finished = [job for job in self.jobs.jobs.values() if self.job_views[job.id]["done"]]
+        for job in finished[:max(0, len(finished) - self.prefs["run_history"])]: self.close_job(job)
+
+    def open_output_log(self):
+        job = self.selected_job()
+        spill = self.job_views[job.id]["spill"] if job else None
+        if not spill: return
+        self.drain_output(job.output, self.job_views[job.id]["pane"], spill)
+        self.open_file_from_path(spill.name)
+
     # --- Execution and Debugging ---
+    # an untitled or modified tab is saved first and its run starts from the save's completion, without blocking Tk
     def run_code(self):
-        if not self.filename: self.save_file()
-        if self.filename and self.language != "html":
-            self.output.config(state="normal")
-            self.output.delete("1.0", "end")
-            Thread(target=self._execute_code).start()
-        elif self.language == "html":
-            self.start_live_server()
-
-    def _execute_code(self):
-        config = self.lang_configs.get(self.language, {})
-        file_no_ext = os.path.splitext(self.filename)[0]
-        cmd = [c.replace("{file}", self.filename).replace("{class}", os.path.basename(file_no_ext)).replace("{file_no_ext}", file_no_ext)
-               for c in config.get("runner", [sys.executable, self.filename])]
+        if self.language == "html": return self.start_live_server()
+        data = self.tabs.get(self.current_tab)
+        if data is None: return
+        if data["path"] and not data["modified"]: return self.start_run(data)
+        self.save_file(lambda: self.start_run(data))
+
+    def start_run(self, data):
+        path, language = data["path"], data["language"]
         try:
-            result = subprocess.check_output(" ".join(cmd), shell=True, stderr=subprocess.STDOUT, timeout=10, universal_newlines=True)
-            self.after(0, lambda text=result: self.output.insert("end", text))
-        except subprocess.CalledProcessError as e:
-            self.after(0, lambda text=f"Error: {e.output}": self.output.insert("end", text))
-        except subprocess.TimeoutExpired:
-            self.after(0, lambda: self.output.insert("end", "Error: Execution timed out"))
-        except Exception as e:
-            self.after(0, lambda text=f"Unexpected error: {str(e)}": self.output.insert("end", text))
-        finally:
-            self.after(0, lambda: self.output.config(state="disabled"))
-            self.last_run_time = time.time()
+            steps, note, cleanup = self.run_steps(path, language)
+        except OSError as e:
+            return messagebox.showerror("Run", f"Could not prepare the build: {e}")
+        job = ProcessRunner(steps, os.path.dirname(path) or None, self.prefs["run_timeout"] or None,
+                            self.job_limits(), cleanup)
+        if note: job.output.append(("info", note))
+        self.add_job(job, os.path.basename(path))
+
+    # compiled languages build into the content-addressed cache and run the artifact from there
+    def run_steps(self, path, language):
+        config = self.lang_configs.get(language, {})
+        file_no_ext = os.path.splitext(path)[0]
+        values = {"{file}": path, "{class}": os.path.basename(file_no_ext), "{file_no_ext}": file_no_ext}
+        if not config.get("build"):
+            runner = config.get("runner") or [sys.executable, "{file}"]
+            argv = expand_command(runner, values, shlex.quote if runner[:2] == ["sh", "-c"] else str)
+            if self.warm_pool and runner == [sys.executable, "{file}"]:
+                cwd = os.path.dirname(path) or None
+                limits = self.job_limits()
+                return [lambda: self.warm_pool.launch(path, cwd, limits) or ProcessRunner.popen(argv, cwd, limits)], None, None
+            return [argv], None, None
+        values["{flags}"] = list(self.prefs["build_flags"].get(language, []))
+        key = self.build_cache.key(path, expand_command(config["build"], dict(values, **{"{out}": ""})))
+        run = expand_command(config["run"], dict(values, **{"{out}": self.build_cache.artifact(key)}))
+        temp = self.build_cache.temp_path(key)
+        build = expand_command(config["build"], dict(values, **{"{out}": temp}))
+        cwd, limits = os.path.dirname(path) or None, self.job_limits()
+        # the cache is checked again when a queued job actually starts, which also marks the artifact fresh
+        def build_step():
+            if self.build_cache.lookup(key): return None
+            if language == "java": os.makedirs(temp)
+            return ProcessRunner.popen(build, cwd, limits)
+        note = "Using cached build\n" if self.build_cache.lookup(key) else None
+        # store() moves temp into place on success; a failed or stopped build leaves it for cleanup
+        return [build_step, lambda: self.build_cache.store(temp, key), run], note, lambda: BuildCache.remove(temp)
 
+    def job_limits(self):
+        limits = [(resource.RLIMIT_CPU, self.prefs["job_cpu_seconds"]), (resource.RLIMIT_AS, self.prefs["job_memory_bytes"])]
+        return [(res, value) for res, value in limits if value]
+
+    # stops the selected job, or the newest running one when the Output pane is showing
+    def stop_run(self):
+        job = self.selected_job() or next(reversed(self.jobs.running()), None)
+        if job: job.stop()
+
+    # an untitled tab is saved first; these continue from the save's completion
     def debug_code(self):
-        if not self.filename: self.save_file()
-        if self.filename and self.language != "html":
+        if not self.filename: return self.save_file(self.debug_code)
+        if self.language != "html":
+            self.run_tabs.select(self.output)
             self.output.config(state="normal")
             self.output.delete("1.0", "end")
             self.output.insert("end", "Debugging started...\n")
@@ -475,8 +2146,8 @@ class VSCodelikeIDE(tk.Tk):
 
     # --- Live Server ---
     def start_live_server(self):
-        if not self.filename: self.save_file()
-        if self.language != "html" or not self.filename: return
+        if not self.filename: return self.save_file(self.start_live_server)
+        if self.language != "html": return
         if self.server_thread and self.server_thread.is_alive():
             return
         
@@ -494,6 +2165,7 @@ class VSCodelikeIDE(tk.Tk):
         
         url = f"http://localhost:{self.server_port}/{os.path.basename(self.filename)}"
         webbrowser.open(url)
+        self.run_tabs.select(self.output)
         self.output.config(state="normal")
         self.output.delete("1.0", "end")
         self.output.insert("end", f"Live server running at {url}\n")
@@ -532,7 +2204,7 @@ class VSCodelikeIDE(tk.Tk):
 
     def toggle_fold_at_line(self, event, line=None):
         if not line:
-            line = self.line_numbers.index("@%d,%d" % (event.x, event.y)).split(".")[0]
+            line = self.text.index("@0,%d" % event.y).split(".")[0]
         start = f"{line}.0"
         content = self.text.get("1.0", "end-1c")
         lines = content.split("\n")
@@ -563,30 +2235,97 @@ class VSCodelikeIDE(tk.Tk):
 
     # --- Find in Files ---
     def find_in_files(self):
-        term = simpledialog.askstring("Find in Files", "Enter search term:", parent=self)
-        if not term: return
-        results = []
-        for root, _, files in os.walk(self.current_dir):
-            for file in files:
-                path = os.path.join(root, file)
-                try:
-                    with open(path, "r", encoding="utf-8") as f:
-                        content = f.read()
-                        for i, line in enumerate(content.split("\n"), 1):
-                            if term in line:
-                                results.append(f"{path}:{i} - {line.strip()}")
-                except:
-                    continue
-        
-        self.output.config(state="normal")
-        self.output.delete("1.0", "end")
-        if results:
-            self.output.insert("end", f"Found {len(results)} matches:\n" + "\n".join(results[:20]))
-            if len(results) > 20:
-                self.output.insert("end", f"\n...and {len(results)-20} more")
-        else:
-            self.output.insert("end", f"No matches found for '{term}'")
-        self.output.config(state="disabled")
+        win = self.open_search_panel()
+        win.entry.focus_set()
+        win.entry.select_range(0, "end")
+
+    def run_search_panel(self, win):
+        globs = lambda var: [g.strip() for g in var.get().split(",") if g.strip()]
+        if win.term.get():
+            self.search_files(win.term.get(), win.regex.get(), win.case.get(), win.word.get(), globs(win.include), globs(win.exclude))
+
+    def search_files(self, term, regex=False, case=True, word=False, include=(), exclude=()):
+        if self.search: self.search.cancel()
+        win = self.open_search_panel()
+        win.title(f"Find in Files: {term}")
+        win.term.set(term)
+        win.tree.delete(*win.tree.get_children())
+        try:
+            search = FileSearch(self.current_dir, term, list(self.prefs["explorer_ignore"]), self.prefs["search_result_limit"],
+                                self.prefs["search_workers"], self.index, regex, case, word, include, exclude)
+        except re.error as e:
+            self.search = None
+            return win.status.config(text=f"Invalid pattern: {e}")
+        self.search = search.start()
+        win.cancel.config(command=search.cancel, state="normal")
+        start = time.perf_counter()
+        def poll():
+            if search is not self.search: return
+            if not win.winfo_exists(): return search.cancel()
+            done = search.finished.is_set()
+            for path, line, text in search.drain():
+                win.tree.insert("", "end", text=os.path.relpath(path, self.current_dir), values=(line, text[:300], path))
+            state = "Stopped" if search.cancelled.is_set() and not search.truncated else "Done" if done else "Searching"
+            more = f" (limit of {search.limit} reached)" if search.truncated else ""
+            win.status.config(text=f"{state}: {search.count} matches in {search.files} files{more}")
+            if not done: return win.after(100, poll)
+            win.cancel.config(state="disabled")
+            if PERF.enabled: PERF.record("find_in_files", time.perf_counter() - start)
+        poll()
+
+    def open_search_panel(self):
+        if self.search_win and self.search_win.winfo_exists(): return self.search_win
+        win = self.search_win = tk.Toplevel(self, bg="#1e1e1e")
+        win.title("Find in Files")
+        win.geometry("800x440")
+        entry = dict(bg="#3c3c3c", fg="white", insertbackground="white", relief="flat")
+        check = dict(bg="#1e1e1e", fg="white", selectcolor="#3c3c3c", activebackground="#1e1e1e", activeforeground="white")
+        for name, value in (("term", ""), ("include", ""), ("exclude", "")): setattr(win, name, tk.StringVar(win, value))
+        for name in ("regex", "case", "word"): setattr(win, name, tk.BooleanVar(win, name == "case"))
+        bar = ttk.Frame(win, style="Dark.TFrame")
+        bar.pack(fill="x", padx=5, pady=(5, 0))
+        win.entry = tk.Entry(bar, textvariable=win.term, **entry)
+        win.entry.pack(side="left", fill="x", expand=True)
+        for label, var in (("Regex", win.regex), ("Match Case", win.case), ("Whole Word", win.word)):
+            tk.Checkbutton(bar, text=label, variable=var, **check).pack(side="left", padx=(5, 0))
+        ttk.Button(bar, text="Search", style="Dark.TButton", command=lambda: self.run_search_panel(win)).pack(side="left", padx=(5, 0))
+        globs = ttk.Frame(win, style="Dark.TFrame")
+        globs.pack(fill="x", padx=5, pady=(5, 0))
+        for label, var in (("Include", win.include), ("Exclude", win.exclude)):
+            ttk.Label(globs, text=label, style="Dark.TLabel").pack(side="left", padx=(0, 5))
+            field = tk.Entry(globs, textvariable=var, **entry)
+            field.pack(side="left", fill="x", expand=True, padx=(0, 5))
+            field.bind("<Return>", lambda e: self.run_search_panel(win))
+        win.entry.bind("<Return>", lambda e: self.run_search_panel(win))
+        bar = ttk.Frame(win, style="Dark.TFrame")
+        bar.pack(fill="x", padx=5, pady=(5, 0))
+        win.status = ttk.Label(bar, style="Dark.TLabel")
+        win.status.pack(side="left")
+        win.cancel = ttk.Button(bar, text="Cancel", style="Dark.TButton", state="disabled")
+        win.cancel.pack(side="right")
+        win.tree = tree = ttk.Treeview(win, columns=("line", "text", "path"), displaycolumns=("line", "text"), style="Dark.Treeview")
+        tree.heading("#0", text="File")
+        tree.heading("line", text="Line")
+        tree.heading("text", text="Text", anchor="w")
+        tree.column("#0", width=220)
+        tree.column("line", width=60, anchor="e")
+        tree.column("text", width=500)
+        tree.pack(fill="both", expand=True, padx=5, pady=5)
+        tree.bind("<Double-1>", lambda e: tree.focus() and self.goto_file_line(tree.set(tree.focus(), "path"), int(tree.set(tree.focus(), "line"))))
+        return win
+
+    def goto_file_line(self, path, line):
+        data = self.files.get(path)
+        if data is None:
+            self.open_file_from_path(path)
+        elif data["tab"] != self.current_tab:
+            self.tab_bar.select(data["tab"])
+            self.switch_tab()
+        if self.filename != path or self.doc is None: return
+        self.text.mark_set("insert", f"{line}.0")
+        self.text.see("insert")
+        self.text.focus_set()
+        self.update_status()
 
     # --- Settings Panel ---
     def open_settings(self):
@@ -618,56 +2357,478 @@ class VSCodelikeIDE(tk.Tk):
                 menu.configure(style="Dark.TMenubutton")
                 menu.grid(row=i, column=1, padx=5, pady=2, sticky="w")
 
+    # --- Performance Panel ---
+    def open_perf_panel(self):
+        perf_win = tk.Toplevel(self, bg="#1e1e1e")
+        perf_win.title("Performance")
+        perf_win.geometry("640x300")
+        columns = ("count", "p50_ms", "p95_ms", "p99_ms", "max_ms")
+        tree = ttk.Treeview(perf_win, columns=columns, style="Dark.Treeview")
+        tree.heading("#0", text="Operation")
+        for col in columns:
+            tree.heading(col, text=col.replace("_ms", " (ms)"))
+            tree.column(col, width=90, anchor="e")
+        tree.pack(fill="both", expand=True, padx=5, pady=5)
+        def refresh():
+            if not perf_win.winfo_exists(): return
+            tree.delete(*tree.get_children())
+            for name, stats in PERF.summary().items():
+                tree.insert("", "end", text=name, values=[stats["count"]] + [f"{stats[c]:.2f}" for c in columns[1:]])
+            perf_win.after(1000, refresh)
+        refresh()
+
+    def export_perf_stats(self):
+        path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("JSON", "*.json")])
+        if path: PERF.export(path)
+
     # --- Folder Explorer ---
     def update_folder_explorer(self):
         self.folder_tree.delete(*self.folder_tree.get_children())
         self.add_folder_to_tree("", self.current_dir)
+        if self.watcher is None or self.watcher.path != self.current_dir:
+            if self.watcher: self.watcher.stop()
+            self.watch_label.config(text="")
+            self.watcher = FileWatcher.create(self.current_dir, lambda events: self.after(0, lambda: self.on_fs_events(events)),
+                                              list(self.prefs["explorer_ignore"])).start()
+            if self.index: self.index.close()
+            self.index = None
+            if self.prefs["search_index"]:
+                try:
+                    self.index = TrigramIndex(self.current_dir, list(self.prefs["explorer_ignore"]), self.prefs["index_max_bytes"]).start()
+                except OSError:
+                    pass
 
+    # directories are listed off-thread the first time they are expanded
     def add_folder_to_tree(self, parent, path):
-        for item in os.listdir(path):
-            full_path = os.path.join(path, item)
-            icon = self.icons["folder"] if os.path.isdir(full_path) else self.icons["file"]
-            node = self.folder_tree.insert(parent, "end", text=f"{icon} {item}", values=(full_path,))
-            if os.path.isdir(full_path): self.add_folder_to_tree(node, full_path)
+        Thread(target=self.list_folder_job, args=(parent, path, list(self.prefs["explorer_ignore"])), daemon=True).start()
+
+    @PERF.timed("list_folder")
+    def list_folder_job(self, parent, path, ignore):
+        try:
+            with os.scandir(path) as it:
+                entries = sorted((not e.is_dir(), e.name.lower(), e.path) for e in it if not ignored(e.name, ignore))
+        except OSError:
+            entries = []
+        self.after(0, lambda: self.fill_folder(parent, path, entries))
+
+    # items already listed are kept in place, so re-listing a folder leaves expanded subfolders alone
+    def fill_folder(self, parent, path, entries):
+        tree = self.folder_tree
+        if not (tree.exists(parent) if parent else path == self.current_dir): return
+        wanted = {full_path for _, _, full_path in entries}
+        tree.delete(*[child for child in tree.get_children(parent) if child not in wanted])
+        for i, (is_file, _, full_path) in enumerate(entries):
+            if not tree.exists(full_path): self.add_tree_node(parent, full_path, not is_file)
+            if tree.parent(full_path) != parent or tree.index(full_path) != i: tree.move(full_path, parent, i)
+
+    # tree items are keyed by path so watcher events can find them directly
+    def add_tree_node(self, parent, path, is_dir=None):
+        if is_dir is None: is_dir = os.path.isdir(path)
+        icon = self.icons["folder"] if is_dir else self.icons["file"]
+        node = self.folder_tree.insert(parent, "end", iid=path, text=f"{icon} {os.path.basename(path)}", values=(path,))
+        if is_dir: self.folder_tree.insert(node, "end", text="Loading…", tags=("placeholder",))
+
+    def folder_loaded(self, node):
+        children = self.folder_tree.get_children(node)
+        return not children or "placeholder" not in self.folder_tree.item(children[0], "tags")
+
+    def on_tree_open(self, event):
+        node = self.folder_tree.focus()
+        if not self.folder_loaded(node): self.add_folder_to_tree(node, node)
+
+    # after a lost event batch, the root and every folder already listed are listed again in place
+    def refresh_loaded_folders(self):
+        tree, stack = self.folder_tree, [""]
+        while stack:
+            node = stack.pop()
+            self.add_folder_to_tree(node, node or self.current_dir)
+            stack += [child for child in tree.get_children(node) if tree.get_children(child) and self.folder_loaded(child)]
+
+    # --- File Watching ---
+    def on_fs_events(self, events):
+        tree, changed = self.folder_tree, set()
+        for event in events:
+            if event[0] == "polling" and self.watcher and event[1] == self.watcher.path:
+                self.watch_label.config(text=f"Watching by polling ({event[2]})")
+            elif event[0] == "unwatched":
+                self.watch_label.config(text=f"Not watching {os.path.relpath(event[1], self.current_dir)} ({event[2]})")
+        events = [event for event in events if event[0] not in ("polling", "unwatched")]
+        if not events: return
+        if any(event[0] == "rescan" for event in events):
+            self.refresh_loaded_folders()
+            if self.index: self.index.start()
+            events = [("modified", path) for path in self.files if path]
+        for kind, path, *moved in events:
+            target = moved[0] if moved else path
+            if kind in ("deleted", "moved") and tree.exists(path): tree.delete(path)
+            if kind in ("created", "moved") and not tree.exists(target) and os.path.lexists(target):
+                parent = os.path.dirname(target)
+                if parent == self.current_dir: parent = ""
+                visible = (not parent or tree.exists(parent)) and self.folder_loaded(parent)
+                if visible and not ignored(os.path.basename(target), self.prefs["explorer_ignore"]):
+                    self.add_tree_node(parent, target)
+            if kind == "moved" and path in self.files: self.retarget_file(path, target)
+            if kind != "deleted": changed.add(target)
+        if self.index: self.index.update([path for event in events if event[0] != "rescan" for path in event[1:]])
+        for path in changed:
+            if path in self.files: self.check_disk_change(self.files[path])
+
+    def retarget_file(self, old, new):
+        if new in self.files: return
+        data = self.files[new] = self.files.pop(old)
+        data["path"] = new
+        if self.filename == old: self.filename = new
+        self.tab_bar.tab(data["tab"], text=os.path.basename(new))
+
+    def check_disk_change(self, data):
+        path = data["path"]
+        if data["doc"] is None and (not data.get("mapped") or data.get("loading")): return
+        try:
+            st = os.stat(path)
+        except OSError:
+            return
+        if self.saver.stamps.get(path) == (st.st_mtime_ns, st.st_size): return
+        self.saver.stamps[path] = (st.st_mtime_ns, st.st_size)
+        if data.get("mapped"): return self.reindex_file(data)
+        if data["modified"] and not messagebox.askyesno(
+                "File Changed", f"{os.path.basename(path)} changed on disk.\nReload it and discard your changes?", parent=self):
+            return
+        self.reload_file(data)
+
+    def reload_file(self, data):
+        try:
+            with open(data["path"], "r", encoding="utf-8") as f:
+                content = f.read()
+        except (OSError, UnicodeDecodeError):
+            return
+        editor = self.editors.get(data["tab"])
+        if editor is self.text: self.doc = None
+        data["doc"], data["modified"] = PieceTable(content), False
+        data.pop("tokens", None)
+        if editor is not None:
+            insert, top = editor.index("insert"), editor.yview()[0]
+            editor.delete("1.0", "end")
+            editor.insert("1.0", content)
+            editor.edit_reset()
+            editor.edit_modified(False)
+            editor.mark_set("insert", insert)
+            editor.yview_moveto(top)
+        if editor is self.text:
+            self.doc, self.hl_states, self.hl_dirty = data["doc"], None, None
+            self.highlight_syntax()
+            self.update_line_numbers()
+        elif editor is not None:
+            data["view"] = (None, None, False, None)
+        self.tab_bar.tab(data["tab"], text=os.path.basename(data["path"]))
+        self.update_status()
 
     def open_from_explorer(self, event):
         sel = self.folder_tree.selection()
         if not sel: return
-        path = self.folder_tree.item(sel, "values")[0]
-        if os.path.isfile(path): self.open_file_from_path(path)
+        values = self.folder_tree.item(sel, "values")
+        if values and os.path.isfile(values[0]): self.open_file_from_path(values[0])
 
     def open_file_from_path(self, path):
-        with open(path, "r", encoding="utf-8") as f:
-            content = f.read()
+        if path in self.files:
+            self.tab_bar.select(self.files[path]["tab"])
+            return self.switch_tab()
         ext = os.path.splitext(path)[1]
         lang = next((l for l, c in self.lang_configs.items() if c["ext"] == ext), "python")
-        self.files[path] = {"content": content, "modified": False, "language": lang}
-        self.tab_bar.add(ttk.Frame(self.tab_bar), text=os.path.basename(path))
-        self.tab_bar.select(self.tab_bar.index("end") - 1)
-        self.switch_tab()
+        size = os.path.getsize(path)
+        if size > self.prefs["large_file_bytes"]:
+            self.open_large_file(path, lang)
+        elif size > self.prefs["background_load_bytes"]:
+            self.load_file_async(path, lang)
+        else:
+            with open(path, "r", encoding="utf-8") as f:
+                content = f.read()
+            self.add_tab(path, PieceTable(content), lang)
+            self.saver.stamp(path)
+
+    # --- Background Loading ---
+    def add_progress(self, label, cancel):
+        frame = ttk.Frame(self.status_bar, style="Dark.TFrame")
+        frame.pack(side="left", padx=5)
+        ttk.Label(frame, text=label, style="Dark.TLabel").pack(side="left")
+        frame.bar = ttk.Progressbar(frame, length=120, maximum=1.0)
+        frame.bar.pack(side="left", padx=4)
+        ttk.Button(frame, text="Cancel", command=cancel, style="Dark.TButton").pack(side="left")
+        return frame
+
+    # the tab stays read-only and pinned in the editor pool until the last chunk lands
+    def load_file_async(self, path, lang):
+        data = self.add_tab(path, None, lang)
+        data["loading"] = cancel = Event()
+        self.editors[data["tab"]].config(state="disabled")
+        progress = self.add_progress(f"Loading {os.path.basename(path)}", cancel.set)
+        Thread(target=self.read_file_job, args=(data, progress), daemon=True).start()
+
+    def read_file_job(self, data, progress):
+        parts, error, size = [], None, max(os.path.getsize(data["path"]), 1)
+        try:
+            with open(data["path"], "r", encoding="utf-8") as f:
+                while not data["loading"].is_set():
+                    chunk = f.read(LOAD_CHUNK_CHARS)
+                    if not chunk: break
+                    parts.append(chunk)
+                    done = f.buffer.tell() / size
+                    self.after(0, lambda chunk=chunk, done=done: self.append_loaded_chunk(data, chunk, progress, done))
+        except (OSError, UnicodeDecodeError) as e:
+            error = str(e)
+        self.after(0, lambda: self.finish_loading(data, parts, progress, error))
+
+    def append_loaded_chunk(self, data, chunk, progress, done):
+        editor = self.editors.get(data["tab"])
+        if editor is None or data["loading"].is_set(): return
+        editor.config(state="normal")
+        editor.insert("end-1c", chunk)
+        editor.config(state="disabled")
+        progress.bar.config(value=done)
+
+    def finish_loading(self, data, parts, progress, error):
+        progress.destroy()
+        cancelled = data.pop("loading").is_set()
+        if data["tab"] not in self.tabs: return
+        if error or cancelled:
+            if error: messagebox.showerror("Open File", error, parent=self)
+            return self.discard_tab(data["tab"])
+        data["doc"] = PieceTable("".join(parts))
+        self.saver.stamp(data["path"])
+        editor = self.editors[data["tab"]]
+        editor.config(state="normal")
+        editor.edit_reset()
+        editor.edit_modified(False)
+        if data["tab"] == self.current_tab:
+            self.doc, self.hl_states, self.hl_dirty = data["doc"], None, None
+            self.highlight_syntax()
+            self.update_line_numbers()
+        else:
+            data["view"] = (None, None, False, None)
+
+    def discard_tab(self, tab):
+        self.forget_tab(tab)
+        if self.tabs: self.switch_tab()
+        else: self.new_file()
+
+    # large files are indexed off-thread, then shown PAGE_LINES at a time from the file
+    def open_large_file(self, path, lang):
+        data = self.add_tab(path, None, lang)
+        data.update(mapped=MappedFile(path), first_line=1)
+        self.saver.stamp(path)
+        self.editors[data["tab"]].config(state="disabled")
+        self.start_indexing(data, data["mapped"])
+        self.update_status()
+
+    # a large file changed on disk is indexed afresh off-thread while the old index keeps serving pages
+    def reindex_file(self, data):
+        self.start_indexing(data, MappedFile(data["path"]))
+
+    def start_indexing(self, data, mapped):
+        data["loading"] = Event()
+        progress = self.add_progress(f"Indexing {os.path.basename(data['path'])}", data["loading"].set)
+        Thread(target=self.index_file_job, args=(data, mapped, progress), daemon=True).start()
+
+    def index_file_job(self, data, mapped, progress):
+        report = lambda done: self.after(0, lambda: progress.bar.config(value=done))
+        indexed = mapped.build_index(data["loading"], report)
+        self.after(0, lambda: self.finish_indexing(data, mapped, progress, indexed))
+
+    def finish_indexing(self, data, mapped, progress, indexed):
+        progress.destroy()
+        cancelled = data.pop("loading").is_set() or not indexed
+        if data["tab"] not in self.tabs or cancelled: mapped.close()
+        if data["tab"] not in self.tabs: return
+        if cancelled: return None if data["mapped"] is not mapped else self.discard_tab(data["tab"])
+        if data["mapped"] is not mapped:
+            data["mapped"].close()
+            data["mapped"] = mapped
+        editor = self.editors.get(data["tab"])  # an evicted editor is paged by load_editor when the tab comes back
+        if editor is not None: self.show_page(editor, data, data["first_line"])
+        self.check_disk_change(data)
+
+    def show_page(self, editor, data, top):
+        mapped = data["mapped"]
+        top = max(1, min(top, mapped.lines))
+        first = max(1, min(top - PAGE_LINES // 4, mapped.lines - PAGE_LINES + 1))
+        last = min(mapped.lines, first + PAGE_LINES - 1)
+        editor.config(state="normal")
+        editor.delete("1.0", "end")
+        editor.insert("1.0", mapped.read_lines(first, last))
+        editor.config(state="disabled")
+        editor.edit_reset()
+        data["first_line"], data["last_line"] = first, last
+        editor.yview(f"{top - first + 1}.0")
+        if editor is self.text:
+            self.hl_states = self.hl_dirty = None
+            self.highlight_syntax()
+            self.update_line_numbers()
+
+    def repage(self):
+        data = self.tabs.get(self.current_tab)
+        if data and data.get("last_line"):
+            self.show_page(self.text, data, data["first_line"] + self.line_of("@0,0") - 1)
 
     # --- Search and Replace ---
+    def create_find_bar(self):
+        self.find_bar = ttk.Frame(self, style="Dark.TFrame", padding=(5, 2))
+        bar = ttk.Frame(self.find_bar, style="Dark.TFrame")
+        bar.pack(fill="x")
+        self.find_var, self.find_regex, self.find_case = tk.StringVar(self), tk.BooleanVar(self), tk.BooleanVar(self)
+        self.replace_var = tk.StringVar(self)
+        self.find_matches, self.find_index, self.find_generation, self.find_revision = [], -1, 0, None
+        field = dict(width=40, bg="#3c3c3c", fg="white", insertbackground="white", relief="flat")
+        entry = self.find_entry = tk.Entry(bar, textvariable=self.find_var, **field)
+        entry.pack(side="left")
+        check = dict(bg="#1e1e1e", fg="white", selectcolor="#3c3c3c", activebackground="#1e1e1e", activeforeground="white")
+        for label, var in (("Regex", self.find_regex), ("Match Case", self.find_case)):
+            tk.Checkbutton(bar, text=label, variable=var, command=self.schedule_find, **check).pack(side="left", padx=(5, 0))
+        self.find_count = ttk.Label(bar, width=14, style="Dark.TLabel")
+        self.find_count.pack(side="left", padx=5)
+        for label, command in (("▲", lambda: self.find_next(-1)), ("▼", lambda: self.find_next(1)), ("✕", self.close_find_bar)):
+            ttk.Button(bar, text=label, width=3, command=command, style="Dark.TButton").pack(side="left")
+        self.find_var.trace_add("write", lambda *args: self.schedule_find())
+        entry.bind("<Return>", lambda e: self.find_next(1))
+        entry.bind("<Shift-Return>", lambda e: self.find_next(-1))
+        entry.bind("<Escape>", lambda e: self.close_find_bar())
+        row = self.replace_row = ttk.Frame(self.find_bar, style="Dark.TFrame")
+        self.replace_entry = tk.Entry(row, textvariable=self.replace_var, **field)
+        self.replace_entry.pack(side="left", pady=(2, 0))
+        ttk.Button(row, text="Replace All", command=self.replace_all, style="Dark.TButton").pack(side="left", padx=5)
+        self.replace_entry.bind("<Return>", lambda e: self.replace_all())
+        self.replace_entry.bind("<Escape>", lambda e: self.close_find_bar())
+
     def find_text(self):
-        term = simpledialog.askstring("Find", "Enter search term:", parent=self)
-        if term:
-            self.text.tag_remove("search", "1.0", "end")
-            start = "1.0"
-            while True:
-                pos = self.text.search(term, start, stopindex="end")
-                if not pos: break
-                self.text.tag_add("search", pos, f"{pos}+{len(term)}c")
-                start = f"{pos}+{len(term)}c"
+        if not self.find_bar.winfo_ismapped(): self.find_bar.pack(fill="x", padx=5, before=self.main_frame)
+        selected = self.text.tag_ranges("sel")
+        if selected and self.line_of(selected[0]) == self.line_of(selected[1]):
+            self.find_var.set(self.text.get(*selected))
+        self.find_entry.focus_set()
+        self.find_entry.select_range(0, "end")
+        self.schedule_find()
+
+    def close_find_bar(self):
+        self.find_generation += 1
+        self.scheduler.cancel("find")
+        self.find_matches = []
+        self.find_bar.pack_forget()
+        self.replace_row.pack_forget()
+        self.text.tag_remove("search", "1.0", "end")
+        self.text.tag_remove("search_current", "1.0", "end")
+        self.text.focus_set()
+
+    # jump=False re-runs the search after an edit or tab switch without moving the cursor
+    def schedule_find(self, jump=True):
+        if self.find_bar.winfo_ismapped(): self.scheduler.schedule("find", lambda: self.run_find(jump), delay=150)
+
+    # matching runs on a document snapshot off-thread; results come back as (line, col, length) in Tk units
+    def run_find(self, jump=True):
+        self.find_generation += 1
+        generation, term, self.find_matches = self.find_generation, self.find_var.get(), []
+        self.find_revision = self.doc.revision if self.doc else None
+        self.text.tag_remove("search", "1.0", "end")
+        self.text.tag_remove("search_current", "1.0", "end")
+        if not term: return self.find_count.config(text="")
+        try:
+            pattern = re.compile(term if self.find_regex.get() else re.escape(term), re.MULTILINE if self.find_case.get() else re.MULTILINE | re.IGNORECASE)
+        except re.error:
+            return self.find_count.config(text="Invalid regex")
+        snapshot = self.doc.snapshot() if self.doc else PieceTable(self.text.get("1.0", "end-1c"))
+        self.find_count.config(text="Searching…")
+        Thread(target=self.find_job, args=(generation, pattern, snapshot, jump), daemon=True).start()
+
+    def find_job(self, generation, pattern, snapshot, jump):
+        text, matches, line, last = snapshot.text(), [], 1, 0
+        wide = self.tk_wide and NON_BMP.search(text) is not None
+        for m in pattern.finditer(text):
+            if generation != self.find_generation: return
+            if m.start() == m.end(): continue
+            line += text.count("\n", last, m.start())
+            last = m.start()
+            matches.append((line, *tk_span(text, text.rfind("\n", 0, m.start()) + 1, m.start(), m.end(), wide)))
+        self.after(0, lambda: self.show_find_results(generation, matches, jump))
+
+    # the match nearest the cursor and the visible ones are tagged at once, the rest in batches
+    def show_find_results(self, generation, matches, jump):
+        if generation != self.find_generation: return
+        self.find_matches = matches
+        if not matches: return self.find_count.config(text="No results")
+        line, col = map(int, self.text.index("insert").split("."))
+        self.select_match(bisect_left(matches, (line, col)) % len(matches), jump)
+        top, bottom = self.visible_lines()
+        lo, hi = bisect_left(matches, (top,)), bisect_left(matches, (bottom + 1,))
+        self.tag_matches(matches[lo:hi])
+        self.tag_find_batch(generation, self.text, matches[:lo] + matches[hi:], 0)
+
+    def tag_find_batch(self, generation, text, matches, i):
+        if generation != self.find_generation or text is not self.text or i >= len(matches): return
+        self.tag_matches(matches[i:i + FIND_BATCH])
+        self.after(1, lambda: self.tag_find_batch(generation, text, matches, i + FIND_BATCH))
+
+    def tag_matches(self, matches):
+        if matches: self.text.tag_add("search", *[i for l, c, n in matches for i in (f"{l}.{c}", f"{l}.{c}+{n}c")])
+
+    def select_match(self, index, jump=True):
+        self.find_index = index
+        line, col, length = self.find_matches[index]
+        self.text.tag_remove("search_current", "1.0", "end")
+        self.text.tag_add("search_current", f"{line}.{col}", f"{line}.{col}+{length}c")
+        self.find_count.config(text=f"{index + 1} of {len(self.find_matches)}")
+        if not jump: return
+        self.text.mark_set("insert", f"{line}.{col}")
+        self.text.see("insert")
+        self.update_status()
+
+    def find_next(self, step):
+        if self.find_matches: self.select_match((self.find_index + step) % len(self.find_matches))
 
     def replace_text(self):
-        find_term = simpledialog.askstring("Replace", "Find what:", parent=self)
-        if not find_term: return
-        replace_term = simpledialog.askstring("Replace", "Replace with:", parent=self)
-        if replace_term is None: return
-        content = self.text.get("1.0", "end-1c")
-        new_content = content.replace(find_term, replace_term)
-        self.text.delete("1.0", "end")
-        self.text.insert("1.0", new_content)
-        self.highlight_syntax()
+        self.find_text()
+        self.replace_row.pack(fill="x")
+        if self.find_var.get(): self.replace_entry.focus_set()
+
+    # only the matched spans are rewritten, bottom-up so earlier (line, col) positions stay valid, as one undo step
+    @PERF.timed("replace_all")
+    def replace_all(self):
+        term, text = self.find_var.get(), self.text
+        if not term: return
+        if self.doc is None: return self.find_count.config(text="Read-only")
+        try:
+            pattern = re.compile(term if self.find_regex.get() else re.escape(term), re.MULTILINE if self.find_case.get() else re.MULTILINE | re.IGNORECASE)
+            source, edits, line, last = self.doc.text(), [], 1, 0
+            wide = self.tk_wide and NON_BMP.search(source) is not None
+            for m in pattern.finditer(source):
+                if m.start() == m.end(): continue
+                line += source.count("\n", last, m.start())
+                last = m.start()
+                new = m.expand(self.replace_var.get()) if self.find_regex.get() else self.replace_var.get()
+                col, length = tk_span(source, source.rfind("\n", 0, m.start()) + 1, m.start(), m.end(), wide)
+                edits.append((line, col, length, m.group(), new))
+        except re.error:
+            return self.find_count.config(text="Invalid regex")
+        if not edits: return self.find_count.config(text="No results")
+        text.mark_set("replace_insert", "insert")
+        text.mark_set("replace_top", "@0,0")
+        text.config(autoseparators=False)
+        text.edit_separator()
+        for line, col, length, old, new in reversed(edits):
+            text.replace(f"{line}.{col}", f"{line}.{col}+{length}c", new)
+        text.edit_separator()
+        text.config(autoseparators=True)
+        text.mark_set("insert", "replace_insert")
+        text.yview("replace_top")
+        text.mark_unset("replace_insert", "replace_top")
+        touched, shift = [], 0
+        for line, col, length, old, new in edits:
+            touched.extend(range(line + shift, line + shift + new.count("\n") + 1))
+            shift += new.count("\n") - old.count("\n")
+        if self.hl_job or self.hl_states is None or self.hl_viewport:
+            self.highlight_syntax()
+        else:
+            self.hl_dirty = None
+            self.rehighlight_lines(sorted(set(touched)))
+        self.update_line_numbers()
+        self.update_status()
+        self.find_count.config(text=f"Replaced {len(edits)}")
 
     # --- Breakpoints ---
     def toggle_breakpoint(self):
@@ -677,22 +2838,26 @@ class VSCodelikeIDE(tk.Tk):
         self.update_line_numbers()
 
     # --- State Management ---
-    def load_last_state(self):
+    # prefs are applied in __init__ before the services that size themselves from them are built
+    def read_config(self):
         try:
             with open(self.config_file, "r") as f:
-                config = json.load(f)
-            last_folder = config.get("last_folder")
-            last_file = config.get("last_file")
-            if last_folder and os.path.isdir(last_folder):
-                self.current_dir = last_folder
-                os.chdir(last_folder)
-            if last_file and os.path.isfile(last_file):
-                self.open_file_from_path(last_file)
+                return json.load(f)
         except (FileNotFoundError, json.JSONDecodeError):
-            pass
+            return {}
+
+    def load_last_state(self):
+        config = self.read_config()
+        last_folder = config.get("last_folder")
+        last_file = config.get("last_file")
+        if last_folder and os.path.isdir(last_folder):
+            self.current_dir = last_folder
+            os.chdir(last_folder)
+        if last_file and os.path.isfile(last_file):
+            self.open_file_from_path(last_file)
 
     def save_last_state(self):
-        config = {"last_folder": self.current_dir, "last_file": self.filename if self.filename else ""}
+        config = {"last_folder": self.current_dir, "last_file": self.filename if self.filename else "", "prefs": self.prefs}
         with open(self.config_file, "w") as f:
             json.dump(config, f)
 
@@ -700,25 +2865,33 @@ class VSCodelikeIDE(tk.Tk):
     def update_status(self):
         line, col = self.text.index("insert").split(".")
         self.line_col_label.config(text=f"Ln {line}, Col {int(col) + 1}")
-        self.status_label.config(text="Modified" if self.files.get(self.filename, {}).get("modified", False) else "Saved")
+        data = self.tabs.get(self.current_tab, {})
+        self.status_label.config(text="Read-only" if data.get("mapped") else "Modified" if data.get("modified", False) else "Saved")
         self.lang_label.config(text=self.language.capitalize())
 
     def set_modified(self, value):
-        if self.filename in self.files:
-            self.files[self.filename]["modified"] = value
-            self.files[self.filename]["content"] = self.text.get("1.0", "end-1c")
+        if self.current_tab in self.tabs:
+            self.tabs[self.current_tab]["modified"] = value
         self.update_status()
 
     def confirm_discard(self):
         return messagebox.askyesno("Unsaved Changes", "Discard unsaved changes?", parent=self)
 
     def on_closing(self):
-        for fname, data in self.files.items():
+        for data in self.tabs.values():
             if data["modified"] and not self.confirm_discard(): return
         if self.server_thread:
             self.server.shutdown()
             self.server.server_close()
         self.save_last_state()
+        self.saver.wait()
+        if self.watcher: self.watcher.stop()
+        if self.index: self.index.close()
+        self.jobs.shutdown()
+        for view in self.job_views.values():
+            if view["spill"]: view["spill"].close()
+        if self.warm_pool: self.warm_pool.stop()
+        if PERF.export_path: PERF.export(PERF.export_path)
         self.destroy()
 
 if __name__ == "__main__":
@@ -740,6 +2913,8 @@ if __name__ == "__main__":
     style.configure("Dark.Vertical.TScrollbar", background="#3c3c3c", troughcolor="#1e1e1e")
     style.configure("Dark.Horizontal.TScrollbar", background="#3c3c3c", troughcolor="#1e1e1e")
     style.configure("Dark.TLabel", background="#1e1e1e", foreground="white")
-    app.text.bind("<<Modified>>", lambda e: app.set_modified(True))
-    app.text.bind("<KeyRelease>", app.on_key_release)
-    app.mainloop()
+    try:
+        app.mainloop()
+    finally:
+        app.jobs.shutdown()  # also when the loop ends on an error or Ctrl+C
+        if app.warm_pool: app.warm_pool.stop()
@@ -0,0 +1,61 @@
+import os
+import time
+
+import litecode
+
+
+def cache(tmp_path, limit):
+    root = tmp_path / "cache"
+    root.mkdir()
+    return litecode.BuildCache(str(root), {"build_cache_bytes": limit})
+
+
+def build(cache, key, size):
+    temp = cache.temp_path(key)
+    with open(temp, "wb") as f: f.write(b"x" * size)
+    cache.store(temp, key)
+
+
+def test_key_changes_with_source_includes_and_command(tmp_path):
+    c = cache(tmp_path, 1 << 20)
+    source, header = tmp_path / "main.c", tmp_path / "util.h"
+    source.write_text('#include "util.h"\nint main() {}\n')
+    header.write_text("int a;\n")
+    key = c.key(str(source), ["cc", "-O2"])
+    assert c.key(str(source), ["cc", "-O2"]) == key
+    assert c.key(str(source), ["cc", "-O0"]) != key
+    header.write_text("int b;\n")
+    assert c.key(str(source), ["cc", "-O2"]) != key
+
+
+def test_store_then_lookup_finds_the_artifact(tmp_path):
+    c = cache(tmp_path, 1 << 20)
+    assert c.lookup("k") is None
+    build(c, "k", 10)
+    assert c.lookup("k") == c.artifact("k")
+    assert [name for name in os.listdir(c.root)] == ["k"]
+
+
+def test_eviction_drops_least_recently_used_first(tmp_path):
+    c = cache(tmp_path, 25)
+    build(c, "old", 10)
+    build(c, "used", 10)
+    past = time.time() - 100
+    os.utime(c.artifact("old"), (past, past))
+    os.utime(c.artifact("used"), (past, past))
+    c.lookup("used")
+    build(c, "new", 10)
+    assert sorted(os.listdir(c.root)) == ["new", "used"]
+
+
+def test_artifact_just_stored_survives_a_cache_smaller_than_it(tmp_path):
+    c = cache(tmp_path, 5)
+    build(c, "big", 10)
+    assert c.lookup("big")
+
+
+def test_store_without_a_build_only_evicts(tmp_path):
+    c = cache(tmp_path, 1 << 20)
+    build(c, "k", 10)
+    c.store(c.temp_path("k"), "k")
+    assert c.lookup("k")
@@ -0,0 +1,111 @@
+import pytest
+
+import litecode
+
+CONFIGS = litecode.VSCodelikeIDE.load_language_configs(None)
+
+
+def lex(language, text):
+    lexer, state, out = CONFIGS[language]["lexer"], None, []
+    for line in text.split("\n"):
+        spans, state = lexer.tokenize(line, state)
+        out.append(([(tag, line[a:b]) for tag, a, b in spans], state))
+    return out
+
+
+def test_single_line_tokens():
+    (spans, state), = lex("python", 'def f(): print("hi", 42)  # done')
+    assert spans == [("keyword", "def"), ("builtin", "print"), ("string", '"hi"'), ("number", "42"),
+                     ("comment", "# done")]
+    assert state is None
+
+
+def test_triple_quoted_string_carries_state_across_lines():
+    lines = lex("python", 'x = """first\nmiddle def\nend""" + 1\nif y:')
+    assert lines[0] == ([("string", '"""first')], ('"""', "string"))
+    assert lines[1] == ([("string", "middle def")], ('"""', "string"))
+    assert lines[2] == ([("string", 'end"""'), ("number", "1")], None)
+    assert lines[3] == ([("keyword", "if")], None)
+
+
+def test_block_opened_and_closed_on_one_line_leaves_no_state():
+    (spans, state), = lex("python", "s = '''a''' if t else 0")
+    assert spans == [("string", "'''a'''"), ("keyword", "if"), ("keyword", "else"), ("number", "0")]
+    assert state is None
+
+
+@pytest.mark.parametrize("language", ["c", "cpp", "java", "javascript"])
+def test_c_style_block_comment_spans_lines(language):
+    lines = lex(language, "int a; /* start\nreturn inside\nend */ return 1;")
+    assert lines[0][1] == ("*/", "comment")
+    assert lines[1] == ([("comment", "return inside")], ("*/", "comment"))
+    assert lines[2][0][0] == ("comment", "end */") and lines[2][1] is None
+    assert ("keyword", "return") in lines[2][0]
+
+
+def test_html_comment_spans_lines():
+    lines = lex("html", "<div><!-- a\n<body>\n--> <p>")
+    assert lines[0][1] == ("-->", "comment")
+    assert lines[1] == ([("comment", "<body>")], ("-->", "comment"))
+    assert lines[2] == ([("comment", "-->"), ("keyword", "p")], None)
+
+
+class FakeText:
+    """Enough of tk.Text for highlight_syntax: line text, end index and recorded tag calls."""
+
+    def __init__(self, text):
+        self.lines, self.tagged = text.split("\n"), []
+
+    def index(self, index):
+        assert index == "end-1c"
+        return f"{len(self.lines)}.{len(self.lines[-1])}"
+
+    def get(self, start, end):
+        first, last = int(start.split(".")[0]), int(end.split(".")[0])
+        return "\n".join(self.lines[first - 1:last])
+
+    def tag_remove(self, tag, first, last):
+        pass
+
+    def tag_add(self, tag, *indices):
+        self.tagged.extend(int(i.split(".")[0]) for i in indices)
+
+
+class Highlighter:
+    highlight_syntax = litecode.VSCodelikeIDE.highlight_syntax
+    line_of = litecode.VSCodelikeIDE.line_of
+    mark_dirty = litecode.VSCodelikeIDE.mark_dirty
+    store_states = litecode.VSCodelikeIDE.store_states
+    apply_highlight = litecode.VSCodelikeIDE.apply_highlight
+
+    def __init__(self, text):
+        self.text, self.language, self.lang_configs = FakeText(text), "python", CONFIGS
+        self.prefs = {"viewport_highlight_lines": 10 ** 6}
+        self.hl_states = self.hl_dirty = self.hl_job = None
+
+    def edit(self, line, content):
+        self.text.lines[line - 1] = content
+        self.text.tagged = []
+        self.mark_dirty(line, line)
+        self.highlight_syntax()
+        return sorted(set(self.text.tagged))
+
+
+def test_edit_that_keeps_the_end_state_stops_after_the_damaged_line():
+    editor = Highlighter("\n".join(f"x = {i}" for i in range(1, 101)))
+    editor.highlight_syntax()
+    assert editor.edit(10, "x = 99 if y else 0") == [10]
+
+
+def test_edit_that_changes_the_end_state_relexes_until_it_settles_again():
+    editor = Highlighter("\n".join(["a = 1", "b = 2", 'c = 3  # """', "d = 4", "e = 5"]))
+    editor.highlight_syntax()
+    assert editor.edit(2, 'b = """') == [2, 3]
+    assert editor.hl_states[1:4] == [None, ('"""', "string"), None]
+
+
+def test_unclosed_string_propagates_to_the_end():
+    editor = Highlighter("\n".join(f"x = {i}" for i in range(1, 21)))
+    editor.highlight_syntax()
+    assert editor.edit(5, "s = '''") == list(range(5, 21))
+    assert editor.hl_states[20] == ("'''", "string")
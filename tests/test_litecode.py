@@ -0,0 +1,43 @@
+import tkinter as tk
+
+import pytest
+
+import litecode
+
+
+@pytest.fixture
+def root():
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        pytest.skip(f"no display: {e}")
+    root.withdraw()
+    yield root
+    root.destroy()
+
+
+class Editor:
+    doc_offset = litecode.VSCodelikeIDE.doc_offset
+    on_text_edit = litecode.VSCodelikeIDE.on_text_edit
+    install_edit_hook = litecode.VSCodelikeIDE.install_edit_hook
+
+    def __init__(self, root, content):
+        self.tk, self.text = root.tk, tk.Text(root)
+        self.text.insert("1.0", content)
+        self.doc = litecode.PieceTable(content)
+        self.hl_generation, self.hl_states, self.hl_dirty = 0, None, None
+        self.install_edit_hook(self.text)
+
+
+def test_edits_after_non_bmp_character_keep_document_in_sync(root):
+    editor = Editor(root, "a\U0001F600bc\nx\U0001F600y")
+    editor.text.insert("1.end", "!")
+    editor.text.delete("2.end-1c")
+    editor.text.replace("1.end-2c", "1.end-1c", "C")
+    assert editor.doc.text() == editor.text.get("1.0", "end-1c") == "a\U0001F600bC!\nx\U0001F600"
+
+
+def test_tk_span_counts_non_bmp_characters_twice_on_narrow_tk():
+    text = "x\n\U0001F600a\U0001F600b"
+    assert litecode.tk_span(text, 2, 4, 6, True) == (3, 3)
+    assert litecode.tk_span(text, 2, 4, 6, False) == (2, 2)
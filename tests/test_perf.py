@@ -0,0 +1,56 @@
+import json
+
+import pytest
+
+import litecode
+
+
+def test_histogram_percentiles_land_in_the_right_bucket():
+    hist = litecode.Histogram()
+    for _ in range(90): hist.record(0.001)
+    for _ in range(10): hist.record(0.1)
+    assert hist.count == 100
+    assert 1.0 <= hist.percentile(50) <= 1.2
+    assert 100 <= hist.percentile(95) <= 120
+    assert hist.percentile(99) == pytest.approx(100, rel=0.2)
+    summary = hist.summary()
+    assert summary["max_ms"] == pytest.approx(100)
+    assert summary["mean_ms"] == pytest.approx(10.9)
+
+
+def test_histogram_percentile_never_exceeds_the_max():
+    hist = litecode.Histogram()
+    hist.record(0.0015)
+    assert hist.percentile(100) == pytest.approx(1.5)
+
+
+def test_histogram_handles_tiny_and_empty_samples():
+    hist = litecode.Histogram()
+    assert hist.percentile(50) == 0.0
+    hist.record(0)
+    hist.record(1e-7)
+    assert hist.counts[0] == 2 and hist.summary()["count"] == 2
+
+
+def test_timed_records_only_when_enabled(tmp_path):
+    perf = litecode.PerfMonitor()
+    perf.enabled = False
+    work = perf.timed("work")(lambda x: x * 2)
+    assert work(2) == 4 and perf.summary() == {}
+    perf.enabled = True
+    assert work(3) == 6
+    assert perf.summary()["work"]["count"] == 1
+    perf.export(tmp_path / "perf.json")
+    assert json.loads((tmp_path / "perf.json").read_text())["metrics"]["work"]["count"] == 1
+
+
+def test_timed_records_even_when_the_call_raises():
+    perf = litecode.PerfMonitor()
+    perf.enabled = True
+
+    @perf.timed("boom")
+    def boom():
+        raise ValueError
+    with pytest.raises(ValueError):
+        boom()
+    assert perf.summary()["boom"]["count"] == 1
@@ -0,0 +1,97 @@
+import random
+
+import pytest
+
+import litecode
+
+
+def offset_of(text, line, col):
+    return sum(len(l) + 1 for l in text.split("\n")[:line - 1]) + col
+
+
+def test_insert_and_delete_track_a_plain_string():
+    rng, doc, model = random.Random(7), litecode.PieceTable("first line\nsecond\n"), "first line\nsecond\n"
+    for _ in range(2000):
+        if model and rng.random() < 0.4:
+            start = rng.randrange(len(model))
+            end = min(len(model), start + rng.randrange(1, 8))
+            doc.delete(start, end)
+            model = model[:start] + model[end:]
+        else:
+            at = rng.randrange(len(model) + 1)
+            chars = rng.choice(["a", "bc", "\n", "x\ny", "\n\n", "😀"])
+            doc.insert(at, chars)
+            model = model[:at] + chars + model[at:]
+        assert doc.length == len(model)
+        assert doc.line_count() == model.count("\n") + 1
+    assert doc.text() == model
+
+
+def test_typing_at_the_end_extends_one_append_piece():
+    doc = litecode.PieceTable("abc")
+    for ch in "hello":
+        doc.insert(doc.length, ch)
+    assert doc.text() == "abchello"
+    assert len(doc.pieces) == 2
+
+
+def test_offset_maps_line_and_column():
+    text = "one\ntwo\n\nfour"
+    doc = litecode.PieceTable(text)
+    doc.insert(4, "2")
+    text = text[:4] + "2" + text[4:]
+    for line in range(1, text.count("\n") + 2):
+        for col in range(len(text.split("\n")[line - 1]) + 1):
+            assert doc.offset(line, col) == offset_of(text, line, col)
+
+
+def test_lines_returns_the_inclusive_range_without_trailing_newline():
+    doc = litecode.PieceTable("a\nb\nc\nd")
+    doc.insert(2, "B")
+    assert doc.lines(2, 3) == "Bb\nc"
+    assert doc.lines(4, 4) == "d"
+    assert doc.lines(1, 4) == doc.text()
+
+
+def test_text_slices_across_pieces():
+    doc = litecode.PieceTable("hello world")
+    doc.insert(5, ",")
+    doc.delete(0, 1)
+    assert doc.text() == "ello, world"
+    assert doc.text(3, 7) == "o, w"
+
+
+def test_delete_past_the_end_is_clamped_and_empty_range_is_a_no_op():
+    doc = litecode.PieceTable("abc")
+    revision = doc.revision
+    doc.delete(2, 2)
+    assert doc.revision == revision
+    doc.delete(1, 100)
+    assert doc.text() == "a" and doc.revision != revision
+
+
+def test_snapshot_is_unaffected_by_later_edits():
+    doc = litecode.PieceTable("abc\ndef")
+    doc.insert(3, "!")
+    snap = doc.snapshot()
+    doc.insert(0, ">")
+    doc.delete(5, 9)
+    assert snap.text() == "abc!\ndef"
+    assert snap.line_count() == 2
+    assert doc.text() == ">abc!"
+
+
+def test_too_many_pieces_compacts_into_one_buffer():
+    doc = litecode.PieceTable("x" * 10)
+    for i in range(litecode.PieceTable.MAX_PIECES):
+        doc.insert(i * 2 % (doc.length + 1), "y")
+    assert len(doc.pieces) <= litecode.PieceTable.MAX_PIECES
+    assert doc.length == 10 + litecode.PieceTable.MAX_PIECES
+
+
+@pytest.mark.parametrize("text", ["", "\n", "no newline"])
+def test_edge_documents(text):
+    doc = litecode.PieceTable(text)
+    assert doc.text() == text
+    assert doc.line_count() == text.count("\n") + 1
+    assert doc.offset(1, 0) == 0
@@ -0,0 +1,141 @@
+import os
+import resource
+import sys
+import time
+
+import litecode
+
+
+def run(steps, **kwargs):
+    job = litecode.ProcessRunner(steps, **kwargs).start()
+    assert job.finished.wait(10)
+    return job
+
+
+def output(job, stream="stdout"):
+    return "".join(text for name, text in job.output if name == stream)
+
+
+def test_job_manager_starts_queued_jobs_under_the_cap():
+    jobs = litecode.JobManager({"max_jobs": 1})
+    first = jobs.submit(litecode.ProcessRunner([["sleep", "30"]]), "first")
+    second = jobs.submit(litecode.ProcessRunner([["true"]]), "second")
+    assert first.started and not second.started
+    first.stop()
+    assert first.finished.wait(5)
+    jobs.pump()
+    assert second.started and second.finished.wait(5)
+    assert second.state == "exit code 0"
+
+
+def test_shutdown_kills_jobs_that_ignore_sigterm_and_drops_queued_ones():
+    jobs = litecode.JobManager({"max_jobs": 1})
+    stubborn = jobs.submit(litecode.ProcessRunner([["sh", "-c", "trap '' TERM; echo ready; sleep 30"]]), "stubborn")
+    queued = jobs.submit(litecode.ProcessRunner([["sleep", "30"]]), "queued")
+    while "ready" not in output(stubborn): time.sleep(0.02)
+    start = time.monotonic()
+    jobs.shutdown(grace=0.3)
+    assert stubborn.finished.wait(5)
+    assert time.monotonic() - start < 2
+    assert stubborn.state == "stopped"
+    assert queued.state == "stopped" and not queued.started
+
+
+def test_exit_code_and_both_streams_are_captured():
+    job = run([[sys.executable, "-c", "import sys; print('out'); print('err', file=sys.stderr); sys.exit(3)"]])
+    assert job.state == "exit code 3"
+    assert output(job) == "out\n" and output(job, "stderr") == "err\n"
+
+
+def test_timeout_kills_the_process_group():
+    start = time.monotonic()
+    job = run([["sh", "-c", "sleep 30 & sleep 30"]], timeout=0.5)
+    assert job.state == "timed out"
+    assert time.monotonic() - start < 5
+
+
+def test_timeout_applies_to_a_child_that_closed_its_stdio():
+    job = run([["sh", "-c", "exec >&- 2>&-; sleep 30"]], timeout=0.5)
+    assert job.state == "timed out"
+
+
+def test_stop_ends_a_running_job():
+    job = litecode.ProcessRunner([["sh", "-c", "echo ready; sleep 30"]]).start()
+    while "ready" not in output(job): time.sleep(0.02)
+    job.stop()
+    assert job.finished.wait(5)
+    assert job.state == "stopped"
+
+
+def test_failed_start_is_reported():
+    job = run([["/nonexistent/program"]])
+    assert job.state == "failed to start"
+    assert output(job, "stderr")
+
+
+def test_steps_run_in_order_and_stop_at_the_first_failure():
+    ran, cleaned = [], []
+    job = run([lambda: ran.append("callable"), ["sh", "-c", "echo one"], ["false"], lambda: ran.append("never")],
+              cleanup=lambda: cleaned.append(True))
+    assert ran == ["callable"] and cleaned == [True]
+    assert output(job) == "one\n" and job.state == "exit code 1"
+
+
+def test_a_step_returning_a_process_is_pumped():
+    job = run([lambda: litecode.ProcessRunner.popen(["echo", "spawned"], None)])
+    assert output(job) == "spawned\n" and job.state == "exit code 0"
+
+
+def test_cleanup_runs_and_finished_is_set_when_a_step_raises():
+    cleaned = []
+
+    def boom():
+        raise RuntimeError("boom")
+    job = litecode.ProcessRunner([boom], cleanup=lambda: cleaned.append(True))
+    try:
+        job.run()
+    except RuntimeError:
+        pass
+    assert job.finished.is_set() and cleaned == [True]
+
+
+def test_output_is_decoded_across_chunk_boundaries():
+    job = run([[sys.executable, "-c", "import sys; b = 'é'.encode(); sys.stdout.buffer.write(b[:1]); "
+                                      "sys.stdout.flush(); sys.stdout.buffer.write(b[1:])"]])
+    assert output(job) == "é"
+
+
+def limits_in_child(limits):
+    job = run([lambda: litecode.ProcessRunner.popen(
+        [sys.executable, "-c", "import resource; print(resource.getrlimit(resource.RLIMIT_CPU), "
+                               "resource.getrlimit(resource.RLIMIT_AS))"], None, limits)])
+    return output(job)
+
+
+def test_limits_are_applied_in_the_child_with_a_cpu_grace_second():
+    out = limits_in_child([(resource.RLIMIT_CPU, 5), (resource.RLIMIT_AS, 1 << 30)])
+    assert out == f"(5, 6) ({1 << 30}, {1 << 30})\n"
+    assert resource.getrlimit(resource.RLIMIT_CPU)[0] != 5
+
+
+def test_limits_never_exceed_the_existing_hard_limit():
+    out = litecode.ProcessRunner.popen(
+        [sys.executable, "-c", "import resource, sys; resource.setrlimit(resource.RLIMIT_CPU, (3, 3)); "
+                               "sys.path.insert(0, sys.argv[1]); import conftest; "
+                               "conftest.litecode.apply_limits([(resource.RLIMIT_CPU, 10)]); "
+                               "print(resource.getrlimit(resource.RLIMIT_CPU))", os.path.dirname(__file__)], None)
+    assert out.communicate(timeout=10)[0] == b"(3, 3)\n"
+
+
+def test_cpu_limit_ends_a_busy_loop():
+    job = run([lambda: litecode.ProcessRunner.popen([sys.executable, "-c", "while True: pass"], None,
+                                                     [(resource.RLIMIT_CPU, 1)])], timeout=10)
+    assert job.state.startswith("killed")
+
+
+def test_expand_command_substitutes_and_splices_lists():
+    values = {"{file}": "a b.c", "{flags}": ["-O2", "-g"], "{out}": "/tmp/x"}
+    assert litecode.expand_command(["cc", "{flags}", "{file}", "-o", "{out}"], values) == \
+        ["cc", "-O2", "-g", "a b.c", "-o", "/tmp/x"]
+    assert litecode.expand_command(["sh", "-c", "run {file}"], values, quote=lambda v: f"'{v}'") == \
+        ["sh", "-c", "run 'a b.c'"]
@@ -0,0 +1,72 @@
+import os
+import threading
+
+import litecode
+from conftest import FakeRoot
+
+
+def saver_with_gate(tmp_path):
+    saver, gate, started = litecode.SaveService(FakeRoot()), threading.Event(), threading.Event()
+    write = saver.write
+
+    def slow_write(path, doc):
+        started.set()
+        gate.wait(5)
+        write(path, doc)
+    saver.write = slow_write
+    return saver, gate, started
+
+
+def test_save_writes_document_and_runs_callback(tmp_path):
+    saver, done = litecode.SaveService(FakeRoot()), []
+    path = str(tmp_path / "a.txt")
+    saver.save(path, litecode.PieceTable("hello\n"), done.append)
+    assert saver.wait(path)
+    assert done == [None]
+    assert open(path).read() == "hello\n"
+    assert saver.stamps[path] == (os.stat(path).st_mtime_ns, os.path.getsize(path))
+
+
+def test_saves_queued_during_a_write_collapse_but_keep_every_callback(tmp_path):
+    saver, gate, started = saver_with_gate(tmp_path)
+    path, done = str(tmp_path / "a.txt"), []
+    saver.save(path, litecode.PieceTable("one"), lambda e: done.append("first"))
+    started.wait(5)
+    saver.save(path, litecode.PieceTable("two"), lambda e: done.append("autosave"))
+    saver.save(path, litecode.PieceTable("three"), lambda e: done.append("run"))
+    gate.set()
+    assert saver.wait(path)
+    assert done == ["first", "autosave", "run"]
+    assert open(path).read() == "three"
+
+
+def test_completions_are_delivered_by_the_tk_poll(tmp_path):
+    root = FakeRoot()
+    saver, done = litecode.SaveService(root), []
+    path = str(tmp_path / "a.txt")
+    saver.save(path, litecode.PieceTable("x"), done.append)
+    with saver.cond:
+        saver.cond.wait_for(lambda: path not in saver.active, 5)
+    assert done == []
+    root.run_pending()
+    assert done == [None]
+    assert saver.timer is None
+
+
+def test_failed_write_reports_error_and_leaves_no_temp_file(tmp_path):
+    saver, done = litecode.SaveService(FakeRoot()), []
+    path = str(tmp_path / "missing" / "a.txt")
+    saver.save(path, litecode.PieceTable("x"), done.append)
+    saver.wait(path)
+    assert isinstance(done[0], OSError)
+
+
+def test_save_through_symlink_keeps_the_link(tmp_path):
+    target, link = tmp_path / "target.txt", tmp_path / "link.txt"
+    target.write_text("old")
+    os.symlink(target, link)
+    saver = litecode.SaveService(FakeRoot())
+    saver.save(str(link), litecode.PieceTable("new"), lambda e: None)
+    saver.wait()
+    assert os.path.islink(link) and target.read_text() == "new"
+    assert [p.name for p in tmp_path.iterdir() if p.suffix == ".tmp"] == []
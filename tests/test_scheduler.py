@@ -0,0 +1,77 @@
+import time
+
+import litecode
+from conftest import FakeRoot
+
+
+def make():
+    root = FakeRoot()
+    return root, litecode.Scheduler(root)
+
+
+def test_rescheduling_a_name_replaces_the_pending_task():
+    root, scheduler, ran = *make(), []
+    scheduler.schedule("highlight", lambda: ran.append("old"))
+    scheduler.schedule("highlight", lambda: ran.append("new"))
+    root.run_pending()
+    assert ran == ["new"]
+    assert scheduler.pending == {} and scheduler.timer is None
+
+
+def test_due_tasks_run_in_priority_order():
+    root, scheduler, ran = *make(), []
+    scheduler.schedule("save", lambda: ran.append("save"), priority=2)
+    scheduler.schedule("highlight", lambda: ran.append("highlight"))
+    scheduler.schedule("preview", lambda: ran.append("preview"), priority=1)
+    root.run_pending()
+    assert ran == ["highlight", "preview", "save"]
+
+
+def test_timer_is_armed_for_the_earliest_task_only():
+    root, scheduler = make()
+    scheduler.schedule("later", lambda: None, delay=1000)
+    scheduler.schedule("sooner", lambda: None, delay=10)
+    assert len(root.calls) == 1
+    assert next(iter(root.calls.values()))[0] <= 10
+
+
+def test_task_not_yet_due_stays_pending():
+    root, scheduler, ran = *make(), []
+    scheduler.schedule("now", lambda: ran.append("now"))
+    scheduler.schedule("later", lambda: ran.append("later"), delay=10000)
+    scheduler.run()
+    assert ran == ["now"] and list(scheduler.pending) == ["later"]
+
+
+def test_cancel_removes_task_and_disarms_timer():
+    root, scheduler, ran = *make(), []
+    scheduler.schedule("find", lambda: ran.append("find"))
+    scheduler.cancel("find")
+    scheduler.cancel("missing")
+    assert root.calls == {} and scheduler.timer is None
+    scheduler.run()
+    assert ran == []
+
+
+def test_task_cancelling_another_due_task_in_the_same_tick():
+    root, scheduler, ran = *make(), []
+    scheduler.schedule("first", lambda: scheduler.cancel("second"))
+    scheduler.schedule("second", lambda: ran.append("second"), priority=1)
+    scheduler.run()
+    assert ran == [] and root.errors == []
+
+
+def test_task_rescheduling_another_with_a_delay_defers_it():
+    root, scheduler, ran = *make(), []
+    scheduler.schedule("first", lambda: scheduler.schedule("second", lambda: ran.append("late"), delay=10000))
+    scheduler.schedule("second", lambda: ran.append("early"), priority=1)
+    scheduler.run()
+    assert ran == [] and "second" in scheduler.pending
+
+
+def test_failing_task_is_reported_and_others_still_run():
+    root, scheduler, ran = *make(), []
+    scheduler.schedule("bad", lambda: 1 / 0)
+    scheduler.schedule("good", lambda: ran.append("good"), priority=1)
+    scheduler.run()
+    assert ran == ["good"] and root.errors[0][0] is ZeroDivisionError
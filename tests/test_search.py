@@ -0,0 +1,126 @@
+import os
+import re
+
+import pytest
+
+import litecode
+
+
+@pytest.fixture
+def tree(tmp_path):
+    files = {
+        "a.py": "def main():\n    return Main\n",
+        "b.txt": "nothing here\nmain street\n",
+        "pkg/c.py": "x = domain\n\nmain\n",
+        "pkg/data.bin": "main\0binary",
+        "build/out.py": "main\n",
+    }
+    for name, content in files.items():
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+    return tmp_path
+
+
+def search(root, term, **kwargs):
+    kwargs.setdefault("ignore", ("build",))
+    s = litecode.FileSearch(str(root), term, workers=2, **kwargs).start()
+    assert s.finished.wait(10)
+    return sorted((os.path.relpath(p, root), line, text) for p, line, text in s.drain()), s
+
+
+def matches(term, data, **kwargs):
+    return list(litecode.FileSearch("/", term, **kwargs).matches(data))
+
+
+def test_plain_search_reports_one_hit_per_line_and_skips_binary_and_ignored(tree):
+    hits, s = search(tree, "main")
+    assert hits == [("a.py", 1, "def main():"), ("b.txt", 2, "main street"), ("pkg/c.py", 1, "x = domain"),
+                    ("pkg/c.py", 3, "main")]
+    assert not s.truncated
+
+
+def test_case_insensitive_and_whole_word(tree):
+    hits, _ = search(tree, "main", case=False, word=True)
+    assert [(p, l) for p, l, _ in hits] == [("a.py", 1), ("a.py", 2), ("b.txt", 2), ("pkg/c.py", 3)]
+
+
+def test_regex_search(tree):
+    hits, _ = search(tree, r"^\s+return \w+$", regex=True)
+    assert hits == [("a.py", 2, "return Main")]
+
+
+def test_include_and_exclude_globs(tree):
+    hits, _ = search(tree, "main", include=("*.py",), exclude=("pkg/*",))
+    assert [p for p, _, _ in hits] == ["a.py"]
+
+
+def test_result_cap_truncates_and_stops(tree):
+    hits, s = search(tree, "main", limit=2)
+    assert len(hits) == 2 and s.truncated
+
+
+def test_bad_regex_raises():
+    with pytest.raises(re.error):
+        litecode.FileSearch("/", "(", regex=True)
+
+
+def test_line_anchors_match_at_every_line():
+    assert matches("^main$", b"main\nx main\nmain", regex=True) == [(1, "main"), (3, "main")]
+
+
+@pytest.mark.parametrize("term, expected", [("^$", []), ("$", []), ("x*", []),
+                                            ("def|", [(1, "def a"), (3, "b def"), (4, "def")])])
+def test_empty_matches_are_skipped_and_terminate(term, expected):
+    assert matches(term, b"def a\n\nb def\ndef", regex=True) == expected
+
+
+def test_cancel_stops_matching():
+    s = litecode.FileSearch("/", "a")
+    s.cancel()
+    assert list(s.matches(b"a\na")) == []
+
+
+def test_large_files_are_scanned_through_mmap(tmp_path, monkeypatch):
+    monkeypatch.setattr(litecode.FileSearch, "MMAP_BYTES", 0)
+    monkeypatch.setattr(litecode.FileSearch, "SNIFF", 4)
+    (tmp_path / "big.txt").write_text("x\n" * 10 + "needle\n")
+    hits, _ = search(tmp_path, "needle")
+    assert hits == [("big.txt", 11, "needle")]
+
+
+@pytest.fixture
+def index(tree, tmp_path, monkeypatch):
+    monkeypatch.setattr(litecode, "user_cache_dir", lambda *parts: str(tmp_path / "cache"))
+    os.makedirs(tmp_path / "cache", exist_ok=True)
+    index = litecode.TrigramIndex(str(tree), ignore=("build",))
+    index.refresh()
+    yield index
+    index.close()
+
+
+def test_index_query_narrows_to_files_with_every_trigram(index, tree):
+    stamps, paths = index.query(b"street")
+    assert {os.path.relpath(p, tree) for p in paths} == {"b.txt"}
+    assert os.path.join(str(tree), "a.py") in stamps
+    assert index.query(b"ma") is None
+
+
+def test_index_is_case_insensitive(index, tree):
+    _, paths = index.query(b"MAIN")
+    assert {os.path.relpath(p, tree) for p in paths} == {"a.py", "b.txt", "pkg/c.py"}
+
+
+def test_search_through_the_index_still_finds_a_hit_in_a_file_changed_since(index, tree):
+    (tree / "b.txt").write_text("nothing here\n")
+    (tree / "pkg" / "c.py").write_text("street = 1\n")
+    hits, _ = search(tree, "street", index=index)
+    assert hits == [("pkg/c.py", 1, "street = 1")]
+
+
+def test_apply_updates_reindexes_changed_files_and_forgets_deleted_ones(index, tree):
+    (tree / "pkg" / "c.py").write_text("street = 1\n")
+    os.unlink(tree / "b.txt")
+    index.apply_updates([str(tree / "pkg"), str(tree / "b.txt")])
+    _, paths = index.query(b"street")
+    assert {os.path.relpath(p, tree) for p in paths} == {"pkg/c.py"}
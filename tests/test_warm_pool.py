@@ -0,0 +1,74 @@
+import os
+
+import pytest
+
+import litecode
+
+
+@pytest.fixture
+def pool():
+    pool = litecode.WarmPool(1, ["json"]).start()
+    yield pool
+    pool.stop()
+
+
+def script(tmp_path, body):
+    path = tmp_path / "script.py"
+    path.write_text(body)
+    return str(path)
+
+
+def run(pool, path, cwd=None, limits=()):
+    job = litecode.ProcessRunner([lambda: pool.launch(path, cwd, limits)]).start()
+    assert job.finished.wait(10)
+    return job, "".join(text for name, text in job.output if name == "stdout")
+
+
+def test_warm_run_sees_script_argv_cwd_and_exit_code(pool, tmp_path):
+    path = script(tmp_path, "import os, sys\nprint(sys.argv[0] == __file__, os.getcwd())\nsys.exit(4)\n")
+    job, out = run(pool, path, str(tmp_path))
+    assert out == f"True {tmp_path}\n"
+    assert job.state == "exit code 4"
+
+
+def test_worker_is_reused_and_each_run_gets_a_fresh_process(pool, tmp_path):
+    path = script(tmp_path, "import os\nprint(os.getpid())\n")
+    worker = pool.idle[0][0].pid
+    _, first = run(pool, path)
+    _, second = run(pool, path)
+    assert first != second
+    assert pool.idle[0][0].pid == worker
+
+
+def test_uncaught_exception_prints_a_traceback_and_fails(pool, tmp_path):
+    path = script(tmp_path, "raise ValueError('bad')\n")
+    job = litecode.ProcessRunner([lambda: pool.launch(path, None)]).start()
+    assert job.finished.wait(10)
+    err = "".join(text for name, text in job.output if name == "stderr")
+    assert "ValueError: bad" in err and job.state == "exit code 1"
+
+
+def test_launch_returns_none_when_every_worker_is_busy(pool, tmp_path):
+    path = script(tmp_path, "import time\ntime.sleep(30)\n")
+    proc = pool.launch(path, None)
+    assert pool.launch(path, None) is None
+    os.kill(proc.pid, 9)
+    assert proc.wait(5) == -9
+    assert proc.poll() == -9
+
+
+def test_dead_worker_is_replaced(pool, tmp_path):
+    old = pool.idle[0][0]
+    old.kill()
+    old.wait()
+    _, out = run(pool, script(tmp_path, "print('ok')\n"))
+    assert out == "ok\n"
+    assert pool.idle[0][0].pid != old.pid
+
+
+def test_stop_right_after_a_warm_launch_ends_the_run(pool, tmp_path):
+    path = script(tmp_path, "import time\ntime.sleep(30)\n")
+    job = litecode.ProcessRunner([lambda: pool.launch(path, None)]).start()
+    job.stop()
+    assert job.finished.wait(5)
+    assert job.state == "stopped"